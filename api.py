@@ -1,30 +1,63 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.responses import JSONResponse
 from models import (
     ContentSubmission, ModerationDecision, AppealRequest, 
     AppealDecision, ModerationAction, WorkflowState
 )
-from redis_client import RedisClient
-from moderation_graph import ModerationWorkflow
-from config import SPAM_TIME_WINDOW, ANTHROPIC_API_KEY
+from redis_client import AsyncRedisClient
+from hot_users import HotUserTracker
+from registry import get_workflow
+from config import SPAM_TIME_WINDOW, MAX_QUEUE_DEPTH, MAX_BATCH_SUBMISSIONS, HOT_USER_SKETCH
+import orjson
+import redis
+from pydantic import ValidationError
+import asyncio
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Dict, Any
-import anthropic
+from typing import Dict, Any, Optional
+
+# Shared async client; its connection pool belongs to the loop it was created on
+redis_client: Optional[AsyncRedisClient] = None
+redis_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Bursting users are counted in-process and synced to Redis in bulk
+hot_users: Optional[HotUserTracker] = HotUserTracker() if HOT_USER_SKETCH else None
+
+async def get_redis() -> AsyncRedisClient:
+    """Shared async Redis client, created lazily if startup didn't run"""
+    global redis_client, redis_loop
+    loop = asyncio.get_running_loop()
+    if redis_client is None or redis_loop is not loop:
+        # Without startup (e.g. TestClient outside a with block) each request may run on its own loop
+        previous = redis_client
+        redis_client = AsyncRedisClient()
+        redis_loop = loop
+        if previous is not None:
+            # Its pool is unusable from this loop, close it instead of leaking it
+            try:
+                await previous.close()
+            except Exception as e:
+                print(f"❌ Failed to close Redis client of a previous loop: {e}")
+    return redis_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the Redis pool and build the shared workflow at startup, close the pool at shutdown"""
+    await get_redis()
+    await asyncio.get_running_loop().run_in_executor(None, get_workflow)
+    yield
+    if redis_client is not None:
+        await sync_hot_users(redis_client)
+        await redis_client.close()
 
 app = FastAPI(
     title="Content Moderation API",
     description="AI-powered content moderation system using LangGraph",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-redis_client = RedisClient()
-
-def get_llm_client():
-    if ANTHROPIC_API_KEY:
-        return anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    return None
-
 @app.get("/")
 async def root():
     return {
@@ -34,55 +67,136 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check():
-    redis_ok = redis_client.ping()
+async def health_check(redis_client: AsyncRedisClient = Depends(get_redis)):
+    redis_ok = await redis_client.ping()
     return {
         "status": "healthy" if redis_ok else "degraded",
         "redis": "connected" if redis_ok else "disconnected",
         "timestamp": datetime.utcnow().isoformat()
     }
 
-@app.post("/moderate", response_model=Dict[str, Any])
-async def submit_content(submission: ContentSubmission):
-    """Submit content for moderation"""
-    
-    # Generate content ID
-    content_id = str(uuid.uuid4())
-    
-    # Track user posts for spam detection
-    post_count = redis_client.track_user_posts(
-        submission.user_id, 
-        SPAM_TIME_WINDOW
-    )
-    
-    # Prepare content data
-    content_data = {
-        "content_id": content_id,
+def build_content_data(submission: ContentSubmission, submitted_at: str) -> Dict[str, Any]:
+    """Queue payload for a submission, under a freshly generated content ID"""
+    return {
+        "content_id": str(uuid.uuid4()),
         "user_id": submission.user_id,
         "content": submission.content,
         "content_type": submission.content_type,
         "metadata": {
-            **submission.metadata,
-            "recent_post_count": post_count,
-            "submitted_at": datetime.utcnow().isoformat()
+            **(submission.metadata or {}),
+            "submitted_at": submitted_at
         }
     }
+
+async def sync_hot_users(redis_client: AsyncRedisClient, force: bool = True):
+    """Add hot users' in-process post counts to their Redis windows"""
+    if hot_users is None or not (force or hot_users.sync_due()):
+        return
+    
+    counts = hot_users.drain()
+    try:
+        await redis_client.add_user_posts(counts, SPAM_TIME_WINDOW)
+    except redis.RedisError as e:
+        print(f"Hot user sync failed: {e}")
+        hot_users.restore(counts)
+
+def local_post_count(user_id: str) -> Optional[int]:
+    """In-process post count when the user is bursting, None to count in Redis"""
+    return hot_users.observe(user_id) if hot_users is not None else None
+
+def queue_full() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Moderation queue is full, please retry shortly",
+        headers={"Retry-After": "5"}
+    )
+
+@app.post("/moderate", response_model=Dict[str, Any])
+async def submit_content(submission: ContentSubmission, redis_client: AsyncRedisClient = Depends(get_redis)):
+    """Submit content for moderation"""
+    
+    content_data = build_content_data(submission, datetime.utcnow().isoformat())
+    
+    # Count the post for spam detection and enqueue it in one atomic call
+    submitted = await redis_client.submit_content(
+        content_data,
+        SPAM_TIME_WINDOW,
+        MAX_QUEUE_DEPTH,
+        local_post_count(submission.user_id)
+    )
+    await sync_hot_users(redis_client, force=False)
     
-    # Enqueue for processing
-    redis_client.enqueue_content(content_data)
+    if not submitted["accepted"]:
+        raise queue_full()
     
     return {
-        "content_id": content_id,
+        "content_id": content_data["content_id"],
         "status": "queued",
         "message": "Content submitted for moderation",
+        "queue_depth": submitted["queue_depth"],
         "estimated_time": "Processing typically completes within 5-10 seconds"
     }
 
+@app.post("/moderate/batch", response_model=Dict[str, Any])
+async def submit_content_batch(request: Request, redis_client: AsyncRedisClient = Depends(get_redis)):
+    """Submit several contents at once, as a JSON array or as NDJSON"""
+    
+    # Plain JSON only, the tagged formats of codec are for what we store in Redis
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            items = [orjson.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON or NDJSON")
+    
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=422, detail="Expected a non-empty JSON array or NDJSON")
+    if len(items) > MAX_BATCH_SUBMISSIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BATCH_SUBMISSIONS} submissions per batch"
+        )
+    
+    # Validate everything before anything is counted or enqueued
+    submissions = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            submissions.append(ContentSubmission.model_validate(item))
+        except ValidationError as e:
+            errors.append({"index": index, "errors": orjson.loads(e.json(include_url=False))})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    
+    submitted_at = datetime.utcnow().isoformat()
+    contents = [build_content_data(submission, submitted_at) for submission in submissions]
+    
+    # Count every post and enqueue the whole batch in one atomic call
+    submitted = await redis_client.submit_batch(
+        contents,
+        SPAM_TIME_WINDOW,
+        MAX_QUEUE_DEPTH,
+        [local_post_count(submission.user_id) for submission in submissions]
+    )
+    await sync_hot_users(redis_client, force=False)
+    
+    if not submitted["accepted"]:
+        raise queue_full()
+    
+    return {
+        "content_ids": [content_data["content_id"] for content_data in contents],
+        "status": "queued",
+        "count": len(contents),
+        "queue_depth": submitted["queue_depth"]
+    }
+
 @app.get("/status/{content_id}", response_model=Dict[str, Any])
-async def get_moderation_status(content_id: str):
+async def get_moderation_status(content_id: str, redis_client: AsyncRedisClient = Depends(get_redis)):
     """Get moderation status and decision"""
     
-    result = redis_client.get_result(content_id)
+    result = await redis_client.get_result(content_id)
     
     if not result:
         raise HTTPException(
@@ -93,11 +207,11 @@ async def get_moderation_status(content_id: str):
     return result
 
 @app.post("/appeal", response_model=Dict[str, Any])
-async def submit_appeal(appeal: AppealRequest):
+async def submit_appeal(appeal: AppealRequest, redis_client: AsyncRedisClient = Depends(get_redis)):
     """Submit an appeal for a moderation decision"""
     
     # Get original decision
-    original = redis_client.get_decision(appeal.content_id)
+    original = await redis_client.get_decision(appeal.content_id)
     
     if not original:
         raise HTTPException(
@@ -112,9 +226,8 @@ async def submit_appeal(appeal: AppealRequest):
             detail="User ID does not match original submission"
         )
     
-    # Process appeal through workflow
-    llm_client = get_llm_client()
-    workflow = ModerationWorkflow(llm_client)
+    # Process appeal through the shared workflow
+    workflow = get_workflow()
     
     appeal_state = {
         "content_id": appeal.content_id,
@@ -130,7 +243,7 @@ async def submit_appeal(appeal: AppealRequest):
         }
     }
     
-    result_state = workflow.process_appeal(appeal_state)
+    result_state = await workflow.aprocess_appeal(appeal_state)
     
     # Determine if appeal is granted
     appeal_granted = result_state.severity < original["severity"] * 0.8
@@ -146,7 +259,7 @@ async def submit_appeal(appeal: AppealRequest):
     )
     
     # Store appeal decision
-    redis_client.store_decision(appeal_decision.model_dump(mode='json'))
+    await redis_client.store_decision(appeal_decision.model_dump(mode='json'))
     
     return appeal_decision.model_dump(mode='json')
 
@@ -155,11 +268,12 @@ async def moderator_review(
     content_id: str,
     action: ModerationAction,
     notes: str,
-    moderator_id: str
+    moderator_id: str,
+    redis_client: AsyncRedisClient = Depends(get_redis)
 ):
     """Moderator manually reviews and modifies a decision"""
     
-    original = redis_client.get_decision(content_id)
+    original = await redis_client.get_decision(content_id)
     
     if not original:
         raise HTTPException(status_code=404, detail="Decision not found")
@@ -172,8 +286,8 @@ async def moderator_review(
     updated_decision.timestamp = datetime.utcnow()
     
     # Store updated decision
-    redis_client.store_decision(updated_decision.model_dump(mode='json'))
-    redis_client.store_result(content_id, updated_decision.model_dump(mode='json'))
+    await redis_client.store_decision(updated_decision.model_dump(mode='json'))
+    await redis_client.store_result(content_id, updated_decision.model_dump(mode='json'))
     
     return {
         "content_id": content_id,
@@ -184,9 +298,11 @@ async def moderator_review(
     }
 
 @app.get("/stats/user/{user_id}")
-async def get_user_stats(user_id: str):
+async def get_user_stats(user_id: str, redis_client: AsyncRedisClient = Depends(get_redis)):
     """Get user moderation statistics"""
-    post_count = redis_client.get_user_post_count(user_id)
+    post_count = await redis_client.get_user_post_count(user_id)
+    if hot_users is not None:
+        post_count += hot_users.pending(user_id)
     
     return {
         "user_id": user_id,
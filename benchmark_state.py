@@ -0,0 +1,92 @@
+"""Micro-benchmark of per-message state handling
+
+Compares the validated path (a pydantic WorkflowState rebuilt at the edge
+and before every node, a validated ModerationDecision dumped twice and
+serialized three times) with the fast path the workflow and worker use
+(validation once at the edge, GraphState inside the graph, one dump and
+one serialization per decision).
+
+Usage: python benchmark_state.py [iterations]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from models import WorkflowState, GraphState, ModerationDecision
+from moderation_graph import ModerationWorkflow
+from redis_client import serialize_once
+from worker import build_decision
+
+# Nodes on the common path: features, near-duplicate, analysis, severity, decision, index
+NODES_PER_MESSAGE = 6
+
+MESSAGE = {
+    "content_id": "bench-1",
+    "user_id": "bench-user",
+    "content": "Buy now! Click here for free money!!! www.example.com",
+    "content_type": "text",
+    "metadata": {"recent_post_count": 2, "submitted_at": "2024-01-01T00:00:00"}
+}
+
+
+def validated_path(message, result, workflow):
+    state = WorkflowState(**message)
+    values = state.model_dump()
+    for _ in range(NODES_PER_MESSAGE):
+        WorkflowState(**values)
+    final = WorkflowState(**result)
+    decision = ModerationDecision(**build_decision(final).model_dump())
+    stored_result = decision.model_dump(mode='json')
+    stored_decision = decision.model_dump(mode='json')
+    return [json.dumps(stored_result), json.dumps(stored_result), json.dumps(stored_decision)]
+
+
+def fast_path(message, result, workflow):
+    values = workflow._start(message)
+    for _ in range(NODES_PER_MESSAGE):
+        GraphState(**values)
+    final = workflow._finish(result)
+    decision = build_decision(final).model_dump(mode='json')
+    return serialize_once([decision, decision])
+
+
+def measure(path, message, result, workflow, iterations):
+    """Mean microseconds and peak KiB allocated per message"""
+    path(message, result, workflow)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        path(message, result, workflow)
+    micros = (time.perf_counter() - started) / iterations * 1e6
+
+    tracemalloc.start()
+    path(message, result, workflow)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return micros, peak / 1024
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workflow = ModerationWorkflow(llm_client=None)
+    result = dict(workflow.process_content(MESSAGE))
+
+    print(f"State handling per message ({iterations} iterations, {NODES_PER_MESSAGE} nodes)")
+    rows = []
+    for name, path in [("validated", validated_path), ("fast", fast_path)]:
+        micros, peak = measure(path, MESSAGE, result, workflow, iterations)
+        rows.append((micros, peak))
+        print(f"  {name:<10} {micros:8.1f} us  {peak:7.1f} KiB peak")
+
+    (slow_us, slow_kib), (fast_us, fast_kib) = rows
+    print(f"  saved      {slow_us - fast_us:8.1f} us  {slow_kib - fast_kib:7.1f} KiB ({slow_us / fast_us:.1f}x faster)")
+
+    started = time.perf_counter()
+    for _ in range(200):
+        workflow.process_content(MESSAGE)
+    print(f"End to end process_content: {(time.perf_counter() - started) / 200 * 1000:.2f} ms per message")
+
+
+if __name__ == "__main__":
+    main()
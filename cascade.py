@@ -0,0 +1,79 @@
+from threading import Lock
+from typing import Dict, Any, Tuple
+
+from config import SEVERITY_THRESHOLDS, CASCADE_APPROVE_MAX_TOKENS
+
+TIERS = ("rules", "llm", "shadow")
+
+
+def rule_verdict(severity: float, features: Dict[str, Any]) -> Tuple[str, float]:
+    """Verdict of the rule stage and its confidence
+
+    "suspend" at or above the suspend cut, with confidence growing from 0.0
+    at the cut to 1.0 at severity 1.0. Anything between the cuts is
+    "escalate" with 0.0. Lexicon terms match inside words ("kill" in
+    "skills"), so the workflow sends suspend verdicts to the LLM too and
+    only an "approve" can decide an item on its own.
+
+    Below the review cut the rules only know that no lexicon matched, which
+    says nothing about issues they can't score (misinformation, context
+    dependent abuse). "approve" confidence is therefore the distance below
+    the cut scaled by how little content there is to miss something in:
+    full up to CASCADE_APPROVE_MAX_TOKENS tokens, shrinking beyond that,
+    and 0.0 for content with links, so longer posts and links go to the LLM.
+    """
+    review = SEVERITY_THRESHOLDS["review"]
+    suspend = SEVERITY_THRESHOLDS["suspend"]
+    if severity < review:
+        if features["url_count"]:
+            return "approve", 0.0
+        coverage = min(1.0, CASCADE_APPROVE_MAX_TOKENS / max(features["token_count"], 1))
+        return "approve", (review - severity) / review * coverage
+    if severity >= suspend:
+        return "suspend", (severity - suspend) / (1.0 - suspend) if suspend < 1.0 else 1.0
+    return "escalate", 0.0
+
+
+def verdict_holds(verdict: str, severity: float) -> bool:
+    """Whether a final severity lands on the same side as a rule verdict"""
+    if verdict == "approve":
+        return severity < SEVERITY_THRESHOLDS["review"]
+    if verdict == "suspend":
+        return severity >= SEVERITY_THRESHOLDS["suspend"]
+    return False
+
+
+class CascadeStats:
+    """Counts of items decided per cascade tier, plus shadow agreement
+
+    rules    approved by the rule stage alone
+    llm      escalated to the LLM: flagged, ambiguous or not confidently clean
+    shadow   decisive for the rules but sampled to the LLM anyway
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.counts: Dict[str, int] = dict.fromkeys(TIERS, 0)
+        self.shadow_agreed = 0
+
+    def record(self, tier: str):
+        with self._lock:
+            self.counts[tier] += 1
+
+    def record_shadow(self, agreed: bool):
+        with self._lock:
+            self.shadow_agreed += agreed
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier counts and hit rates, and how often shadowed rules were right"""
+        with self._lock:
+            counts = dict(self.counts)
+            shadow_agreed = self.shadow_agreed
+
+        total = sum(counts.values())
+        return {
+            "items": total,
+            **counts,
+            **{f"{tier}_rate": counts[tier] / total if total else 0.0 for tier in TIERS},
+            "shadow_agreement": shadow_agreed / counts["shadow"] if counts["shadow"] else 0.0
+        }
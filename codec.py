@@ -0,0 +1,85 @@
+from threading import local
+from typing import Any, Union
+
+import orjson
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from config import PAYLOAD_FORMAT, PAYLOAD_COMPRESS_MIN_BYTES, PAYLOAD_COMPRESS_LEVEL
+
+# Tagged payloads start with a NUL byte, which can't start a JSON document,
+# followed by a format byte. Anything else is JSON: every payload written
+# before this codec, and everything still written in the json format. A new
+# format gets a new format byte, so readers that know it decode old and new
+# payloads alike during a rollout.
+TAG = b"\x00"
+MSGPACK = b"m"
+ZSTD = b"z"  # zstd frame holding another payload, tagged or not
+
+_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+if PAYLOAD_FORMAT == "msgpack" and msgpack is None:
+    print("❌ PAYLOAD_FORMAT=msgpack but msgpack is not installed, writing JSON")
+if PAYLOAD_COMPRESS_MIN_BYTES and zstandard is None:
+    print("❌ PAYLOAD_COMPRESS_MIN_BYTES is set but zstandard is not installed, not compressing")
+
+# zstd contexts are not thread safe, keep one pair per thread
+_zstd = local()
+
+
+def _compressor():
+    if not hasattr(_zstd, "compressor"):
+        _zstd.compressor = zstandard.ZstdCompressor(level=PAYLOAD_COMPRESS_LEVEL)
+    return _zstd.compressor
+
+
+def _decompressor():
+    if not hasattr(_zstd, "decompressor"):
+        _zstd.decompressor = zstandard.ZstdDecompressor()
+    return _zstd.decompressor
+
+
+def encode_json(obj: Any) -> bytes:
+    """Untagged JSON, for payloads read as text (Lua scripts, stream producers)"""
+    return orjson.dumps(obj, default=str, option=_JSON_OPTIONS)
+
+
+def encode(
+    obj: Any,
+    payload_format: str = PAYLOAD_FORMAT,
+    compress_min_bytes: int = PAYLOAD_COMPRESS_MIN_BYTES
+) -> bytes:
+    """Serialize in the configured format, zstd-compressing large bodies"""
+    if payload_format == "msgpack" and msgpack is not None:
+        data = TAG + MSGPACK + msgpack.packb(obj, default=str)
+    else:
+        data = encode_json(obj)
+
+    if compress_min_bytes and zstandard is not None and len(data) >= compress_min_bytes:
+        data = TAG + ZSTD + _compressor().compress(data)
+    return data
+
+
+def decode(data: Union[bytes, str]) -> Any:
+    """Deserialize a payload of any format, tagged or legacy JSON"""
+    if isinstance(data, str) or data[:1] != TAG:
+        return orjson.loads(data)
+
+    payload_format = data[1:2]
+    if payload_format == ZSTD:
+        if zstandard is None:
+            raise ValueError("Payload is zstd-compressed but zstandard is not installed")
+        return decode(_decompressor().decompress(data[2:]))
+    if payload_format == MSGPACK:
+        if msgpack is None:
+            raise ValueError("Payload is msgpack but msgpack is not installed")
+        return msgpack.unpackb(data[2:])
+    raise ValueError(f"Unknown payload format {payload_format!r}")
@@ -9,9 +9,31 @@ API_PORT = int(os.getenv("API_PORT", "8000"))
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "128"))  # per async connection pool
 
 # Anthropic API Key
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
+LLM_MODEL = os.getenv("LLM_MODEL", "claude-sonnet-4-20250514")
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "256"))  # per analyzed item, output is a small tool call
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # in-flight LLM calls per async workflow
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))  # retries on connection errors, timeouts, 408/409/429 and 5xx
+LLM_RETRY_BASE_DELAY = 0.5  # seconds, doubled per attempt with full jitter
+LLM_RETRY_MAX_DELAY = 8.0  # seconds
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "15"))  # seconds per LLM request, keep attempts x timeout under WORKER_HEARTBEAT_TIMEOUT
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "1"))  # items per LLM call on the async path, 1 disables
+LLM_BATCH_WAIT_MS = int(os.getenv("LLM_BATCH_WAIT_MS", "20"))  # max wait to fill a batch
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))  # per process-wide LLM client
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "16"))  # idle connections kept open
+LLM_KEEPALIVE_EXPIRY = 60.0  # seconds an idle connection is kept
+
+# Cascade Settings
+CASCADE = os.getenv("CASCADE", "0") == "1"  # screen with rules first, only clearly clean content skips the LLM
+CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.5"))  # rule confidence that skips the LLM
+CASCADE_APPROVE_MAX_TOKENS = int(os.getenv("CASCADE_APPROVE_MAX_TOKENS", "20"))  # longer clean posts lose rule confidence, the lexicon can't see misinformation
+CASCADE_SHADOW_RATE = float(os.getenv("CASCADE_SHADOW_RATE", "0.0"))  # share of rule-decided items also sent to the LLM
+
+# Graph Settings
+GRAPH_BRANCH_WORKERS = int(os.getenv("GRAPH_BRANCH_WORKERS", "16"))  # threads for parallel branches per workflow
 
 # Moderation Policies
 MODERATION_POLICIES: Dict[str, Any] = {
@@ -45,10 +67,98 @@ SEVERITY_THRESHOLDS = {
     "approve": 0.0
 }
 
+# Rule-based Lexicons (term -> weight, matched as substrings of lowercased content)
+TOXIC_KEYWORDS: Dict[str, float] = {
+    "hate": 0.3, "kill": 0.4, "die": 0.4, "death": 0.3,
+    "stupid": 0.2, "idiot": 0.2, "dumb": 0.2, "moron": 0.2,
+    "trash": 0.2, "garbage": 0.2, "worthless": 0.3,
+    "worst": 0.1, "terrible": 0.1, "horrible": 0.2,
+    "fuck": 0.3, "shit": 0.2, "damn": 0.1,
+    "loser": 0.2, "pathetic": 0.2, "disgusting": 0.3
+}
+
+SPAM_INDICATORS: Dict[str, float] = {
+    "buy now": 0.2, "click here": 0.2, "free money": 0.2, "win prize": 0.2,
+    "$$$": 0.2, "limited offer": 0.2, "act now": 0.2, "discount": 0.2,
+    "www.": 0.2, "http": 0.2
+}
+
+SARCASM_INDICATORS: Dict[str, float] = {
+    "yeah right": 0.3, "sure": 0.2, "totally": 0.2,
+    "obviously": 0.2, "lol": 0.1, "whatever": 0.2,
+    "great job": 0.1, "well done": 0.1, "genius": 0.1
+}
+
 # Spam Detection Settings
 SPAM_BURST_THRESHOLD = 5  # posts in time window
 SPAM_TIME_WINDOW = 60  # seconds
+SPAM_WINDOW_BUCKETS = 12  # buckets per sliding window, bounds memory per user
+
+# Hot User Sketch Settings
+HOT_USER_SKETCH = os.getenv("HOT_USER_SKETCH", "0") == "1"  # count bursting users in-process in the API
+HOT_USER_SKETCH_WIDTH = int(os.getenv("HOT_USER_SKETCH_WIDTH", "4096"))  # overcount <= e / width of window posts
+HOT_USER_SKETCH_DEPTH = int(os.getenv("HOT_USER_SKETCH_DEPTH", "4"))  # bound fails with probability e^-depth
+HOT_USER_SYNC_INTERVAL = float(os.getenv("HOT_USER_SYNC_INTERVAL", "1.0"))  # seconds between syncs to Redis
 
 # Queue Settings
 CONTENT_QUEUE = "content_moderation_queue"
-RESULT_QUEUE = "moderation_results"
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "0"))  # /moderate answers 503 beyond this, 0 disables
+MAX_BATCH_SUBMISSIONS = int(os.getenv("MAX_BATCH_SUBMISSIONS", "500"))  # items per /moderate/batch request
+DEQUEUE_TIMEOUT = 5  # seconds a blocking dequeue waits for content
+WORKER_BATCH_SIZE = int(os.getenv("WORKER_BATCH_SIZE", "32"))  # items a worker dequeues per round trip
+
+# Result Stream Settings
+RESULT_STREAM = "moderation_result_stream"
+RESULT_STREAM_MAXLEN = int(os.getenv("RESULT_STREAM_MAXLEN", "100000"))  # approximate results kept for consumers
+RESULT_BATCH_SIZE = int(os.getenv("RESULT_BATCH_SIZE", "100"))  # results per consumer read
+RESULT_CLAIM_IDLE_MS = int(os.getenv("RESULT_CLAIM_IDLE_MS", "60000"))  # pending results older than this are taken over
+
+# Reliable Queue Settings
+RELIABLE_QUEUE = os.getenv("RELIABLE_QUEUE", "0") == "1"  # claim jobs into per-worker processing lists
+PROCESSING_QUEUE_PREFIX = "processing:"  # + worker id
+PROCESSING_LEASES = "processing_leases"  # worker id -> lease deadline
+DELIVERY_ATTEMPTS = "delivery_attempts"  # content id -> expired deliveries
+DEAD_LETTER_QUEUE = "content_moderation_dead_letter"
+VISIBILITY_TIMEOUT = int(os.getenv("VISIBILITY_TIMEOUT", "300"))  # seconds a claimed batch may run without a heartbeat
+MAX_DELIVERY_ATTEMPTS = int(os.getenv("MAX_DELIVERY_ATTEMPTS", "3"))  # deliveries before dead-lettering
+REAPER_INTERVAL = 10  # seconds between expired-lease sweeps
+
+# Worker Pool Settings
+WORKER_HEARTBEAT_TIMEOUT = int(os.getenv("WORKER_HEARTBEAT_TIMEOUT", "120"))  # seconds before a stuck child is restarted
+WORKER_DRAIN_TIMEOUT = int(os.getenv("WORKER_DRAIN_TIMEOUT", "30"))  # seconds children get to finish jobs on shutdown
+WORKER_RESTART_BASE_DELAY = 1.0  # seconds before restarting a failed child, doubled per consecutive failure
+WORKER_RESTART_MAX_DELAY = 60.0  # seconds; a child that stays up this long resets its failure count
+
+# Stream Processor Settings
+CONTENT_STREAM = "content_stream"
+STREAM_GROUP = "moderators"
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "64"))  # entries per XREADGROUP
+STREAM_CONCURRENCY = int(os.getenv("STREAM_CONCURRENCY", "16"))  # messages processed at once
+STREAM_CLAIM_IDLE_MS = int(os.getenv("STREAM_CLAIM_IDLE_MS", "60000"))  # pending entries older than this are reclaimed
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", "100000"))  # approximate stream length kept
+STREAM_MAX_AGE = int(os.getenv("STREAM_MAX_AGE", "0"))  # seconds, trims by MINID instead of MAXLEN when set
+STREAM_MAINTENANCE_INTERVAL = 30  # seconds between reclaim/trim runs
+STREAM_MAX_DELIVERIES = int(os.getenv("STREAM_MAX_DELIVERIES", "3"))  # deliveries before a reclaimed entry is dead-lettered
+STREAM_DEAD_LETTER = "content_stream_dead_letter"
+
+# Decision Cache Settings
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", "10000"))  # in-process entries
+DECISION_CACHE_TTL = int(os.getenv("DECISION_CACHE_TTL", "3600"))  # seconds, both tiers
+
+# Near-duplicate Detection Settings
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))  # estimated Jaccard similarity
+NEAR_DUP_WINDOW = int(os.getenv("NEAR_DUP_WINDOW", "3600"))  # seconds an entry stays indexed
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "50000"))  # in-process entries
+NEAR_DUP_PERMUTATIONS = 64
+NEAR_DUP_BANDS = 16
+NEAR_DUP_SHINGLE_SIZE = 5  # characters
+
+# Language Detection Settings
+LANGUAGE_CACHE_SIZE = int(os.getenv("LANGUAGE_CACHE_SIZE", "10000"))  # in-process entries
+LANGUAGE_MIN_LETTERS = 20  # shorter ASCII text is assumed English without running the detector
+LANGUAGE_MAX_CHARS = 1000  # characters the detector reads
+
+# Payload Codec Settings
+PAYLOAD_FORMAT = os.getenv("PAYLOAD_FORMAT", "json")  # json or msgpack, for results, decisions and cached entries
+PAYLOAD_COMPRESS_MIN_BYTES = int(os.getenv("PAYLOAD_COMPRESS_MIN_BYTES", "0"))  # zstd-compress payloads at least this large, 0 disables
+PAYLOAD_COMPRESS_LEVEL = 3
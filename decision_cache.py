@@ -0,0 +1,153 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Dict, Any
+import hashlib
+import json
+import time
+
+import redis
+
+import config
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with size and optional TTL eviction"""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def policy_version(model: str) -> str:
+    """Fingerprint of everything a cached decision depends on"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "policies": config.MODERATION_POLICIES,
+            "thresholds": config.SEVERITY_THRESHOLDS
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class DecisionCache:
+    """Two-tier cache of content analyses keyed by normalized content hash
+
+    The first tier is an in-process LRU, the second is shared through Redis.
+    Keys include the policy version, so editing MODERATION_POLICIES or
+    SEVERITY_THRESHOLDS (or switching models) invalidates both tiers.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        model: str = config.LLM_MODEL,
+        max_size: int = config.DECISION_CACHE_SIZE,
+        ttl: int = config.DECISION_CACHE_TTL
+    ):
+        self.redis_client = redis_client
+        self.model = model
+        self.ttl = ttl
+        self.local = LRUCache(max_size, ttl)
+        self.version = policy_version(model)
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _key(self, normalized_content: str) -> str:
+        version = policy_version(self.model)
+        if version != self.version:
+            # Policy changed: entries under the old version can never match again
+            self.local.clear()
+            self.version = version
+
+        text = " ".join(normalized_content.split())
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        return f"{self.version}:{digest}"
+
+    def get(self, normalized_content: str) -> Optional[Dict[str, Any]]:
+        """Look up an analysis, checking the local tier before Redis"""
+        key = self._key(normalized_content)
+
+        analysis = self.local.get(key)
+        if analysis is not None:
+            self.local_hits += 1
+            return _copy(analysis)
+
+        if self.redis_client:
+            try:
+                analysis = self.redis_client.get_cached_analysis(key)
+            except redis.RedisError as e:
+                print(f"Decision cache read failed: {e}")
+                analysis = None
+
+            if analysis is not None:
+                self.redis_hits += 1
+                self.local.set(key, analysis)
+                return _copy(analysis)
+
+        self.misses += 1
+        return None
+
+    def cached_locally(self, normalized_content: str) -> bool:
+        """Whether the local tier holds an analysis, without counting a lookup"""
+        return self.local.get(self._key(normalized_content)) is not None
+
+    def set(self, normalized_content: str, analysis: Dict[str, Any]):
+        """Store an analysis in both tiers"""
+        key = self._key(normalized_content)
+        self.local.set(key, _copy(analysis))
+
+        if self.redis_client:
+            try:
+                self.redis_client.cache_analysis(key, analysis, self.ttl)
+            except redis.RedisError as e:
+                print(f"Decision cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for both tiers"""
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+            "local_size": len(self.local),
+            "policy_version": self.version
+        }
+
+
+def _copy(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    return {**analysis, "detected_issues": list(analysis.get("detected_issues", []))}
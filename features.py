@@ -0,0 +1,44 @@
+from collections import Counter
+from typing import Dict, Any
+import re
+
+URL_PATTERN = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+ALPHA_PATTERN = re.compile(r"[^\W\d_]")
+DIGIT_PATTERN = re.compile(r"\d")
+
+
+def extract_features(content: str) -> Dict[str, Any]:
+    """Build the feature record shared by the workflow nodes in one linear pass
+
+    Returns a flat dict so it can travel in the graph state:
+        normalized          lowercased content used for lexicon matching
+        char_count          length of the normalized content
+        alpha_count         letters (any script)
+        digit_count         decimal digits
+        non_ascii_count     characters outside ASCII
+        token_count         whitespace-separated tokens
+        unique_token_count  distinct tokens
+        repetition_ratio    share of tokens taken by the most common token
+        url_count           URL-looking substrings
+    """
+    normalized = content.lower()
+    tokens = normalized.split()
+    token_counts = Counter(tokens)
+    char_count = len(normalized)
+
+    if tokens:
+        repetition_ratio = token_counts.most_common(1)[0][1] / len(tokens)
+    else:
+        repetition_ratio = 0.0
+
+    return {
+        "normalized": normalized,
+        "char_count": char_count,
+        "alpha_count": len(ALPHA_PATTERN.findall(normalized)),
+        "digit_count": len(DIGIT_PATTERN.findall(normalized)),
+        "non_ascii_count": char_count - len(normalized.encode("ascii", "ignore")),
+        "token_count": len(tokens),
+        "unique_token_count": len(token_counts),
+        "repetition_ratio": repetition_ratio,
+        "url_count": len(URL_PATTERN.findall(normalized))
+    }
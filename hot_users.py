@@ -0,0 +1,123 @@
+from threading import Lock
+from typing import Dict, Any, Optional
+import hashlib
+import math
+import time
+
+import numpy as np
+
+from config import (
+    SPAM_BURST_THRESHOLD, SPAM_TIME_WINDOW, SPAM_WINDOW_BUCKETS,
+    HOT_USER_SKETCH_WIDTH, HOT_USER_SKETCH_DEPTH, HOT_USER_SYNC_INTERVAL
+)
+
+
+class HotUserTracker:
+    """In-process count-min sketch of posts per user over a sliding window
+
+    The window is split into the same buckets as the Redis post counter,
+    with one sketch per bucket. A count-min sketch never undercounts and,
+    with probability at least 1 - e^-depth, overcounts a user by at most
+    e / width times the posts it saw in the window. A user is hot only when
+    the estimate minus that bound still reaches the burst threshold, so with
+    that probability a hot user really did post at least threshold times.
+
+    Posts of hot users are not counted in Redis one by one. They accumulate
+    here and are added to the Redis counters in bulk by drain(), which the
+    API calls every sync interval. Everyone else keeps exact Redis counting.
+    """
+
+    def __init__(
+        self,
+        threshold: int = SPAM_BURST_THRESHOLD,
+        window: int = SPAM_TIME_WINDOW,
+        width: int = HOT_USER_SKETCH_WIDTH,
+        depth: int = HOT_USER_SKETCH_DEPTH,
+        sync_interval: float = HOT_USER_SYNC_INTERVAL
+    ):
+        self.threshold = threshold
+        self.window = window
+        self.width = width
+        self.depth = depth
+        self.sync_interval = sync_interval
+        self.epsilon = math.e / width
+
+        self.bucket_size = max(1, window // SPAM_WINDOW_BUCKETS)
+        self.buckets = max(1, window // self.bucket_size)
+        self._sketches = np.zeros((self.buckets, depth, width), dtype=np.int64)
+        self._epochs = np.full(self.buckets, -1, dtype=np.int64)
+        # Posts per bucket, what every sketch row of the bucket sums to
+        self._totals = np.zeros(self.buckets, dtype=np.int64)
+        self._rows = np.arange(depth)
+
+        self._pending: Dict[str, int] = {}
+        self._last_sync = time.monotonic()
+        self._lock = Lock()
+        self.hot_posts = 0
+        self.posts = 0
+
+    def _columns(self, user_id: str) -> np.ndarray:
+        digest = hashlib.blake2b(user_id.encode(), digest_size=8 * self.depth).digest()
+        return np.frombuffer(digest, dtype=np.uint64) % np.uint64(self.width)
+
+    def observe(self, user_id: str, now: Optional[float] = None) -> Optional[int]:
+        """Count a post; return a lower bound of the user's posts if they are hot
+
+        None means the post should be counted in Redis as usual.
+        """
+        epoch = int((time.time() if now is None else now) // self.bucket_size)
+        slot = epoch % self.buckets
+        columns = self._columns(user_id)
+
+        with self._lock:
+            if self._epochs[slot] != epoch:
+                self._sketches[slot] = 0
+                self._totals[slot] = 0
+                self._epochs[slot] = epoch
+            self._sketches[slot, self._rows, columns] += 1
+            self._totals[slot] += 1
+            self.posts += 1
+
+            # Gather only the user's counters of the live buckets, never a copy of the sketches
+            live = np.flatnonzero(self._epochs > epoch - self.buckets)
+            estimate = int(self._sketches[live[:, None], self._rows, columns].sum(axis=0).min())
+            seen = int(self._totals[live].sum())
+            lower_bound = estimate - math.ceil(self.epsilon * seen)
+
+            if lower_bound < self.threshold:
+                return None
+
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+            self.hot_posts += 1
+            return lower_bound
+
+    def pending(self, user_id: str) -> int:
+        """Posts of a user not yet added to Redis"""
+        with self._lock:
+            return self._pending.get(user_id, 0)
+
+    def sync_due(self) -> bool:
+        return bool(self._pending) and time.monotonic() - self._last_sync >= self.sync_interval
+
+    def drain(self) -> Dict[str, int]:
+        """Take the per-user post counts accumulated since the last sync"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_sync = time.monotonic()
+        return pending
+
+    def restore(self, counts: Dict[str, int]):
+        """Put back counts whose sync failed"""
+        with self._lock:
+            for user_id, count in counts.items():
+                self._pending[user_id] = self._pending.get(user_id, 0) + count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "posts": self.posts,
+                "hot_posts": self.hot_posts,
+                "pending_users": len(self._pending),
+                "error_bound": self.epsilon,
+                "failure_probability": math.exp(-self.depth)
+            }
@@ -0,0 +1,86 @@
+from typing import Dict, Any, Optional, Tuple
+import hashlib
+import re
+
+from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+from langdetect.lang_detect_exception import LangDetectException
+
+from config import LANGUAGE_CACHE_SIZE, LANGUAGE_MIN_LETTERS, LANGUAGE_MAX_CHARS
+from decision_cache import LRUCache
+from features import extract_features
+
+DEFAULT_LANGUAGE = "en"
+
+# Scripts written by a single language langdetect knows, checked in order
+# (kana before anything else so Japanese isn't mistaken for Chinese)
+SCRIPT_LANGUAGES = [
+    (re.compile(r"[\u3040-\u30ff]"), "ja"),
+    (re.compile(r"[\u1100-\u11ff\uac00-\ud7af]"), "ko"),
+    (re.compile(r"[\u0e00-\u0e7f]"), "th"),
+    (re.compile(r"[\u0370-\u03ff]"), "el"),
+    (re.compile(r"[\u0590-\u05ff]"), "he"),
+    (re.compile(r"[\u0b80-\u0bff]"), "ta"),
+    (re.compile(r"[\u0c00-\u0c7f]"), "te"),
+    (re.compile(r"[\u0c80-\u0cff]"), "kn"),
+    (re.compile(r"[\u0d00-\u0d7f]"), "ml"),
+    (re.compile(r"[\u0a80-\u0aff]"), "gu"),
+    (re.compile(r"[\u0a00-\u0a7f]"), "pa")
+]
+
+# Profiles are loaded once per process; the seed makes results deterministic
+_factory = DetectorFactory()
+_factory.load_profile(PROFILES_DIRECTORY)
+_factory.set_seed(0)
+
+_cache = LRUCache(LANGUAGE_CACHE_SIZE)
+
+
+def _script_language(text: str, alpha_count: int) -> Optional[Tuple[str, float]]:
+    """Language of a script used by a single language, if most letters are in it"""
+    for pattern, language in SCRIPT_LANGUAGES:
+        share = len(pattern.findall(text)) / alpha_count
+        if share >= 0.5:
+            return language, min(share, 1.0)
+    return None
+
+
+def _detect(text: str) -> Tuple[str, float]:
+    detector = _factory.create()
+    detector.set_max_text_length(LANGUAGE_MAX_CHARS)
+    detector.append(text)
+    try:
+        best = detector.get_probabilities()[0]
+    except (LangDetectException, IndexError):
+        return DEFAULT_LANGUAGE, 0.0
+    return best.lang, best.prob
+
+
+def detect_language(text: str, features: Optional[Dict[str, Any]] = None) -> Tuple[str, float]:
+    """Language code of the text and the confidence in it (0.0 when assumed)
+
+    Text without letters and short ASCII text are assumed English, text
+    mostly in a single-language script is decided by the script, and
+    everything else goes through the seeded detector. Results are cached
+    by text hash.
+    """
+    if features is None:
+        features = extract_features(text)
+
+    alpha_count = features["alpha_count"]
+    if not alpha_count:
+        return DEFAULT_LANGUAGE, 0.0
+    if not features["non_ascii_count"] and alpha_count < LANGUAGE_MIN_LETTERS:
+        return DEFAULT_LANGUAGE, 0.0
+
+    key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    if features["non_ascii_count"]:
+        result = _script_language(text, alpha_count) or _detect(text)
+    else:
+        result = _detect(text)
+
+    _cache.set(key, result)
+    return result
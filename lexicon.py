@@ -0,0 +1,98 @@
+from collections import deque
+from typing import Dict, List, Set, Tuple
+
+
+class LexiconMatcher:
+    """Aho-Corasick automaton that scores several weighted lexicons in one pass.
+
+    The automaton is compiled once from ``{category: {term: weight}}`` and a
+    scan walks the text a single time regardless of how many terms are
+    loaded. Terms match as plain substrings (the same semantics as
+    ``term in text``) and each term contributes its weight at most once.
+    """
+
+    def __init__(self, lexicons: Dict[str, Dict[str, float]]):
+        self.categories: List[str] = list(lexicons)
+        self._terms: List[Tuple[str, str, float]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for category, terms in lexicons.items():
+            for term, weight in terms.items():
+                if term:
+                    self._add_term(category, term, weight)
+
+        self._fail: List[int] = [0] * len(self._goto)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    @property
+    def terms(self) -> List[Tuple[str, str, float]]:
+        """(category, term, weight) for every term, indexed by term id"""
+        return list(self._terms)
+
+    def _add_term(self, category: str, term: str, weight: float):
+        """Insert a term into the trie"""
+        term_id = len(self._terms)
+        self._terms.append((category, term, weight))
+
+        node = 0
+        for ch in term:
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][ch] = child
+                self._goto.append({})
+                self._out.append(())
+            node = child
+        self._out[node] = self._out[node] + (term_id,)
+
+    def _link(self):
+        """Compute failure links breadth-first and fold outputs along them"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(ch, 0) if node else 0
+                out[child] = out[child] + out[fail[child]]
+
+    def scan(self, text: str) -> Set[int]:
+        """Return the ids of every term occurring in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        matched: Set[int] = set()
+        node = 0
+
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0) if node else root.get(ch, 0)
+            if out[node]:
+                matched.update(out[node])
+
+        return matched
+
+    def score(self, text: str) -> Dict[str, float]:
+        """Sum the weights of matched terms per category"""
+        scores = dict.fromkeys(self.categories, 0.0)
+        # Accumulate in lexicon order so results match a term-by-term scan
+        for term_id in sorted(self.scan(text)):
+            category, _, weight = self._terms[term_id]
+            scores[category] += weight
+        return scores
+
+    def matches(self, text: str) -> Dict[str, List[str]]:
+        """Return the matched terms per category"""
+        found: Dict[str, List[str]] = {category: [] for category in self.categories}
+        for term_id in sorted(self.scan(text)):
+            category, term, _ = self._terms[term_id]
+            found[category].append(term)
+        return found
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class LLMBatcher:
+    """Micro-batches concurrent analyses into multi-item LLM calls
+
+    Items queue up until batch_size are waiting or max_wait_ms has passed
+    since the first one arrived, whichever comes first, and are then sent to
+    analyze_many together. analyze_many returns one analysis per item, or
+    None for items whose part of the response failed validation.
+    """
+
+    def __init__(
+        self,
+        analyze_many: Callable[[List[Any]], Awaitable[List[Optional[Dict[str, Any]]]]],
+        batch_size: int,
+        max_wait_ms: float
+    ):
+        self.analyze_many = analyze_many
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()
+
+    async def submit(self, state) -> Optional[Dict[str, Any]]:
+        """Queue an item and wait for its share of a batched response"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((state, future))
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Send up to batch_size queued items"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending[:self.batch_size]
+        self._pending = self._pending[self.batch_size:]
+
+        loop = asyncio.get_running_loop()
+        if batch:
+            task = loop.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+        # Leftovers start a new wait window
+        if self._pending:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.analyze_many([state for state, _ in batch])
+        except Exception as e:
+            print(f"LLM batch analysis failed: {e}")
+            results = [None] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,51 @@
+from threading import Lock
+from typing import Dict, Any
+
+
+class TokenUsage:
+    """Running totals of LLM token usage, including prompt-cache activity"""
+
+    FIELDS = (
+        "input_tokens",
+        "output_tokens",
+        "cache_creation_input_tokens",
+        "cache_read_input_tokens"
+    )
+
+    def __init__(self):
+        self._lock = Lock()
+        self.requests = 0
+        self.items = 0
+        self.totals: Dict[str, int] = dict.fromkeys(self.FIELDS, 0)
+        self.last: Dict[str, int] = dict.fromkeys(self.FIELDS, 0)
+
+    def record(self, usage, items: int = 1) -> Dict[str, int]:
+        """Add the usage block of one response covering items moderated items"""
+        call = {field: getattr(usage, field, None) or 0 for field in self.FIELDS}
+        with self._lock:
+            self.requests += 1
+            self.items += items
+            for field, value in call.items():
+                self.totals[field] += value
+            self.last = call
+        return call
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals plus per-item averages and the prefix-cache hit share"""
+        with self._lock:
+            totals = dict(self.totals)
+            requests = self.requests
+            items = self.items
+
+        prompt_tokens = (
+            totals["input_tokens"] +
+            totals["cache_creation_input_tokens"] +
+            totals["cache_read_input_tokens"]
+        )
+        return {
+            "requests": requests,
+            "items": items,
+            **totals,
+            "tokens_per_item": (prompt_tokens + totals["output_tokens"]) / items if items else 0.0,
+            "prefix_cache_hit_rate": totals["cache_read_input_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        }
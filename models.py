@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Annotated, get_type_hints
 from datetime import datetime
 from enum import Enum
+import operator
 
 class ContentType(str, Enum):
     TEXT = "text"
@@ -55,6 +56,23 @@ class AppealDecision(BaseModel):
     reviewed_by: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+class LLMItemAnalysis(BaseModel):
+    """One item of a multi-item LLM moderation response"""
+    id: int
+    toxicity_score: float = Field(ge=0.0, le=1.0)
+    spam_score: float = Field(ge=0.0, le=1.0)
+    sarcasm_score: float = Field(ge=0.0, le=1.0)
+    detected_issues: List[str] = Field(default_factory=list)
+    analysis: str = ""
+
+def max_score(current: float, update: float) -> float:
+    """Reducer keeping the highest score any branch reported"""
+    return max(current, update)
+
+# Scores and issues are merged across parallel branches instead of overwritten
+Score = Annotated[float, max_score]
+Issues = Annotated[List[str], operator.add]
+
 class WorkflowState(BaseModel):
     content_id: str
     user_id: str
@@ -62,12 +80,22 @@ class WorkflowState(BaseModel):
     content_type: ContentType
     metadata: Dict[str, Any] = Field(default_factory=dict)
     
+    # Feature record built once by the first graph node
+    features: Dict[str, Any] = Field(default_factory=dict)
+    
     # Analysis results
     language: Optional[str] = None
-    toxicity_score: float = 0.0
-    spam_score: float = 0.0
-    sarcasm_score: float = 0.0
-    detected_issues: List[str] = Field(default_factory=list)
+    language_confidence: float = 0.0
+    toxicity_score: Score = 0.0
+    spam_score: Score = 0.0
+    sarcasm_score: Score = 0.0
+    detected_issues: Issues = Field(default_factory=list)
+    near_duplicate: Dict[str, Any] = Field(default_factory=dict)
+    
+    # Cascade screening: rule analysis, its confidence and the tier that decided
+    rule_analysis: Dict[str, Any] = Field(default_factory=dict)
+    rule_confidence: float = 0.0
+    cascade_tier: Optional[str] = None
     
     # Decision
     severity: float = 0.0
@@ -81,3 +109,34 @@ class WorkflowState(BaseModel):
     
     class Config:
         arbitrary_types_allowed = True
+
+# Field -> reducer, as declared on WorkflowState
+STATE_REDUCERS = {
+    name: hint.__metadata__[0]
+    for name, hint in get_type_hints(WorkflowState, include_extras=True).items()
+    if hasattr(hint, "__metadata__")
+}
+
+class GraphState:
+    """Slotted, unvalidated WorkflowState used inside the graph
+    
+    The graph rebuilds its state object before every node. Input is
+    validated once as a WorkflowState at the edge, so inside the graph the
+    fields are just copied onto slots. The annotations (with reducers) are
+    WorkflowState's, so the graph's channels are unchanged.
+    """
+    __slots__ = tuple(WorkflowState.model_fields)
+    __annotations__ = get_type_hints(WorkflowState, include_extras=True)
+    
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values[name])
+
+def merge_updates(updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine node updates the way the graph's state channels would"""
+    merged: Dict[str, Any] = {}
+    for update in updates:
+        for key, value in update.items():
+            reducer = STATE_REDUCERS.get(key)
+            merged[key] = reducer(merged[key], value) if reducer and key in merged else value
+    return merged
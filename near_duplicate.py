@@ -0,0 +1,192 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Dict, Any, List, Set, Tuple
+import hashlib
+import time
+import uuid
+import zlib
+
+import numpy as np
+import redis
+
+import config
+from config import (
+    NEAR_DUP_THRESHOLD, NEAR_DUP_WINDOW, NEAR_DUP_MAX_ENTRIES,
+    NEAR_DUP_PERMUTATIONS, NEAR_DUP_BANDS, NEAR_DUP_SHINGLE_SIZE
+)
+from decision_cache import policy_version
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of recently suspended content
+
+    Content is shingled into character n-grams and reduced to a MinHash
+    signature; signatures are split into bands and each band is hashed into a
+    bucket, so near-duplicates collide in at least one bucket with high
+    probability. Entries live in a sliding window bounded both by age and by
+    count, and can optionally be shared with other processes through Redis.
+    Bucket keys include the policy version, so a suspension is only reused
+    under the policies and thresholds it was decided with.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        threshold: float = NEAR_DUP_THRESHOLD,
+        window: int = NEAR_DUP_WINDOW,
+        max_entries: int = NEAR_DUP_MAX_ENTRIES,
+        num_perm: int = NEAR_DUP_PERMUTATIONS,
+        bands: int = NEAR_DUP_BANDS,
+        shingle_size: int = NEAR_DUP_SHINGLE_SIZE,
+        seed: int = 1,
+        model: str = config.LLM_MODEL
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.redis_client = redis_client
+        self.threshold = threshold
+        self.window = window
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.model = model
+        self.version = policy_version(model)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        # entry_id -> (inserted_at, signature, analysis, band_keys)
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray, Dict[str, Any], List[str]]]" = OrderedDict()
+        self._buckets: Dict[str, Set[str]] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, normalized_content: str) -> np.ndarray:
+        """MinHash signature of the character shingles of the content"""
+        text = " ".join(normalized_content.split())
+        size = self.shingle_size
+        shingles = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode()) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[str]:
+        version = policy_version(self.model)
+        if version != self.version:
+            # Policy changed: suspensions decided under the old version must not be reused
+            with self._lock:
+                self._entries.clear()
+                self._buckets.clear()
+            self.version = version
+
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            keys.append(f"{version}:{band}:{hashlib.blake2b(rows, digest_size=8).hexdigest()}")
+        return keys
+
+    def _evict(self, now: float):
+        """Drop entries outside the window or over the size bound"""
+        while self._entries:
+            entry_id, (inserted_at, _, _, band_keys) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and inserted_at > now - self.window:
+                break
+            del self._entries[entry_id]
+            for key in band_keys:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(entry_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def query(self, signature: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return the closest indexed entry at or above the similarity threshold"""
+        band_keys = self._band_keys(signature)
+        best: Optional[Dict[str, Any]] = None
+
+        with self._lock:
+            self._evict(time.time())
+            candidates = set()
+            for key in band_keys:
+                candidates.update(self._buckets.get(key, ()))
+            local = [(entry_id, self._entries[entry_id]) for entry_id in candidates]
+
+        for entry_id, (_, entry_signature, analysis, entry_keys) in local:
+            similarity = float(np.mean(entry_signature == signature))
+            if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                best = {"entry_id": entry_id, "similarity": similarity, "analysis": analysis, "band_keys": entry_keys}
+
+        if best is None and self.redis_client:
+            try:
+                shared = self.redis_client.get_near_duplicate_candidates(band_keys)
+            except redis.RedisError as e:
+                print(f"Near-duplicate lookup failed: {e}")
+                shared = []
+
+            for entry in shared:
+                entry_signature = np.array(entry["signature"], dtype=np.uint32)
+                similarity = float(np.mean(entry_signature == signature))
+                if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                    best = {
+                        "entry_id": entry["entry_id"],
+                        "similarity": similarity,
+                        "analysis": entry["analysis"],
+                        "band_keys": self._band_keys(entry_signature)
+                    }
+
+        return best
+
+    def add(self, signature: np.ndarray, analysis: Dict[str, Any]) -> str:
+        """Index a moderated item's signature and analysis"""
+        entry_id = uuid.uuid4().hex
+        band_keys = self._band_keys(signature)
+        now = time.time()
+
+        with self._lock:
+            self._entries[entry_id] = (now, signature, analysis, band_keys)
+            for key in band_keys:
+                self._buckets.setdefault(key, set()).add(entry_id)
+            self._evict(now)
+
+        if self.redis_client:
+            try:
+                self.redis_client.add_near_duplicate(
+                    entry_id,
+                    band_keys,
+                    {"entry_id": entry_id, "signature": signature.tolist(), "analysis": analysis},
+                    self.window
+                )
+            except redis.RedisError as e:
+                print(f"Near-duplicate index write failed: {e}")
+
+        return entry_id
+
+    def refresh(self, entry_id: str, band_keys: List[str]):
+        """Restart the window of an entry whose decision was reused
+
+        Reused decisions are not indexed again, so a spam wave keeps
+        matching the original entry, not copies of copies of it.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is not None:
+                self._entries[entry_id] = (now,) + entry[1:]
+                self._entries.move_to_end(entry_id)
+
+        if self.redis_client:
+            try:
+                self.redis_client.refresh_near_duplicate(entry_id, band_keys, self.window)
+            except redis.RedisError as e:
+                print(f"Near-duplicate index refresh failed: {e}")
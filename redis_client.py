@@ -1,7 +1,171 @@
 import redis
-import json
-from typing import Optional, Dict, Any
-from config import REDIS_HOST, REDIS_PORT, REDIS_DB, CONTENT_QUEUE, RESULT_QUEUE
+from redis import asyncio as aioredis
+from redis.client import NEVER_DECODE
+import time
+import uuid
+from typing import Optional, Dict, Any, List
+from config import (
+    REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_MAX_CONNECTIONS, CONTENT_QUEUE, RESULT_STREAM,
+    PROCESSING_QUEUE_PREFIX, PROCESSING_LEASES, DELIVERY_ATTEMPTS, DEAD_LETTER_QUEUE,
+    VISIBILITY_TIMEOUT, MAX_DELIVERY_ATTEMPTS, SPAM_TIME_WINDOW, SPAM_WINDOW_BUCKETS,
+    RESULT_STREAM_MAXLEN
+)
+from codec import encode, encode_json, decode
+
+# Results, decisions and cached entries go through the codec and may be binary,
+# so they are read without the clients' UTF-8 decoding. Queued content stays
+# JSON text: the Lua scripts read it with cjson.
+RAW = {NEVER_DECODE: []}
+
+# Count another delivery of a job that was handed out before. Returns false
+# after dead-lettering it once it used up its deliveries, or right away when it
+# can't be parsed (it would fail every time).
+REDELIVER_LUA = """
+local function redeliver(item, attempts_key, dead_letter_key, max_attempts)
+    local ok, job = pcall(cjson.decode, item)
+    if not ok or type(job) ~= 'table' or job['content_id'] == nil then
+        redis.call('LPUSH', dead_letter_key, item)
+        return false
+    end
+    local content_id = tostring(job['content_id'])
+    local attempts = redis.call('HINCRBY', attempts_key, content_id, 1)
+    if attempts >= max_attempts then
+        redis.call('LPUSH', dead_letter_key, item)
+        redis.call('HDEL', attempts_key, content_id)
+        return false
+    end
+    return true
+end
+"""
+
+# Extend a worker's lease and move up to ARGV[1] items from the queue into its
+# processing list. A batch that was never acked is handed back instead, as a
+# redelivery, so a batch that keeps failing ends up dead-lettered.
+CLAIM_SCRIPT = REDELIVER_LUA + """
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[3])
+local pending = redis.call('LRANGE', KEYS[2], 0, -1)
+if #pending > 0 then
+    local oldest_first = {}
+    for i = #pending, 1, -1 do
+        if redeliver(pending[i], KEYS[4], KEYS[5], tonumber(ARGV[4])) then
+            oldest_first[#oldest_first + 1] = pending[i]
+        else
+            redis.call('LREM', KEYS[2], 1, pending[i])
+        end
+    end
+    if #oldest_first > 0 then
+        return oldest_first
+    end
+end
+local items = redis.call('RPOP', KEYS[1], ARGV[1])
+if not items then
+    return {}
+end
+redis.call('LPUSH', KEYS[2], unpack(items))
+return items
+"""
+
+# Requeue the processing lists of workers whose lease expired, dead-lettering
+# jobs that have used up their deliveries
+REAP_SCRIPT = REDELIVER_LUA + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local requeued, dead = 0, 0
+for _, worker_id in ipairs(expired) do
+    local processing = ARGV[3] .. worker_id
+    local items = redis.call('LRANGE', processing, 0, -1)
+    -- Newest first, so the oldest job ends up next in line
+    for i = 1, #items do
+        if redeliver(items[i], KEYS[3], KEYS[4], tonumber(ARGV[2])) then
+            redis.call('RPUSH', KEYS[2], items[i])
+            requeued = requeued + 1
+        else
+            dead = dead + 1
+        end
+    end
+    redis.call('DEL', processing)
+    redis.call('ZREM', KEYS[1], worker_id)
+end
+return {requeued, dead}
+"""
+
+# Sliding-window post counter: a hash of per-bucket counts keyed by bucket number
+# (server time // bucket_size). Buckets that slid out of the window are dropped on
+# every call, so a user never holds more than window / bucket_size fields.
+WINDOW_COUNT_LUA = """
+local function window_count(key, increment, window, bucket_size)
+    local current = math.floor(tonumber(redis.call('TIME')[1]) / bucket_size)
+    local oldest = current - math.floor(window / bucket_size) + 1
+    if increment > 0 then
+        redis.call('HINCRBY', key, current, increment)
+        redis.call('EXPIRE', key, window)
+    end
+    local total = 0
+    local buckets = redis.call('HGETALL', key)
+    for i = 1, #buckets, 2 do
+        if tonumber(buckets[i]) < oldest then
+            redis.call('HDEL', key, buckets[i])
+        else
+            total = total + tonumber(buckets[i + 1])
+        end
+    end
+    return total
+end
+"""
+
+# ARGV: increment (0 only reads), window, bucket size
+WINDOW_COUNT_SCRIPT = WINDOW_COUNT_LUA + """
+return window_count(KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]))
+"""
+
+# Count submissions in their users' rate windows and enqueue them, each with its
+# count spliced between its prefix/suffix halves of JSON. KEYS are the queue
+# followed by one post window per submission, ARGV the window, the max queue
+# depth (0 disables it), the bucket size and a (local count, prefix, suffix)
+# triple per submission. A local count above 0 was already counted in-process
+# and is used as is. A batch that would push the queue past the max depth is
+# rejected whole, without counting.
+SUBMIT_SCRIPT = WINDOW_COUNT_LUA + """
+local window = tonumber(ARGV[1])
+local bucket_size = tonumber(ARGV[3])
+local depth = redis.call('LLEN', KEYS[1])
+local max_depth = tonumber(ARGV[2])
+local n = #KEYS - 1
+if max_depth > 0 and depth + n > max_depth then
+    return {0, depth}
+end
+local result = {1, depth + n}
+local payloads = {}
+for i = 1, n do
+    local count = tonumber(ARGV[3 * i + 1])
+    if count == 0 then
+        count = window_count(KEYS[i + 1], 1, window, bucket_size)
+    end
+    payloads[i] = ARGV[3 * i + 2] .. count .. ARGV[3 * i + 3]
+    result[i + 2] = count
+end
+redis.call('LPUSH', KEYS[1], unpack(payloads))
+return result
+"""
+
+def serialize_once(records: List[Dict[str, Any]]) -> Dict[int, bytes]:
+    """Encoded payload per distinct record object, keyed by id()"""
+    payloads = {}
+    for record in records:
+        if id(record) not in payloads:
+            payloads[id(record)] = encode(record)
+    return payloads
+
+def publish_result(pipe, payload: bytes):
+    """Queue an XADD of a result onto the capped result stream"""
+    # With ~ Redis only trims whole stream nodes, keeping the cap cheap per XADD
+    pipe.xadd(RESULT_STREAM, {"data": payload}, maxlen=RESULT_STREAM_MAXLEN, approximate=True)
+
+def post_window_key(user_id: str) -> str:
+    return f"user_post_window:{user_id}"
+
+def bucket_size(time_window: int) -> int:
+    """Seconds per bucket of a sliding post window"""
+    return max(1, time_window // SPAM_WINDOW_BUCKETS)
 
 class RedisClient:
     def __init__(self):
@@ -11,67 +175,391 @@ class RedisClient:
             db=REDIS_DB,
             decode_responses=True
         )
+        self._claim = self.client.register_script(CLAIM_SCRIPT)
+        self._reap = self.client.register_script(REAP_SCRIPT)
+        self._window_count = self.client.register_script(WINDOW_COUNT_SCRIPT)
     
     def enqueue_content(self, content_data: Dict[str, Any]) -> str:
         """Add content to moderation queue"""
         content_id = content_data["content_id"]
-        self.client.lpush(CONTENT_QUEUE, json.dumps(content_data))
+        self.client.lpush(CONTENT_QUEUE, encode_json(content_data))
         return content_id
     
     def dequeue_content(self, timeout: int = 5) -> Optional[Dict[str, Any]]:
         """Get next content from queue"""
         result = self.client.brpop(CONTENT_QUEUE, timeout=timeout)
         if result:
-            _, data = result
-            return json.loads(data)
+            jobs = self._decode_jobs([result[1]])
+            return jobs[0] if jobs else None
         return None
     
+    def dequeue_batch(self, max_items: int, timeout: int = 5) -> List[Dict[str, Any]]:
+        """Get up to max_items queued contents, blocking only while the queue is empty"""
+        # RPOP with a count drains a busy queue in one round trip
+        items = self.client.rpop(CONTENT_QUEUE, max_items)
+        if not items:
+            result = self.client.brpop(CONTENT_QUEUE, timeout=timeout)
+            if not result:
+                return []
+            items = [result[1]]
+            if max_items > 1:
+                items += self.client.rpop(CONTENT_QUEUE, max_items - 1) or []
+        return self._decode_jobs(items)
+    
+    def claim_batch(
+        self,
+        worker_id: str,
+        max_items: int,
+        timeout: int = 5,
+        visibility_timeout: int = VISIBILITY_TIMEOUT,
+        max_attempts: int = MAX_DELIVERY_ATTEMPTS
+    ) -> List[Dict[str, Any]]:
+        """Move up to max_items queued contents into the worker's processing list
+        
+        Claimed items stay in the processing list until ack_batch, and an
+        unacked batch is returned again by the next claim, counting as a
+        delivery attempt. If the worker stops heartbeating for
+        visibility_timeout, requeue_expired hands them to another worker.
+        """
+        processing = f"{PROCESSING_QUEUE_PREFIX}{worker_id}"
+        keys = [CONTENT_QUEUE, processing, PROCESSING_LEASES, DELIVERY_ATTEMPTS, DEAD_LETTER_QUEUE]
+        
+        items = self._claim(
+            keys=keys,
+            args=[max_items, time.time() + visibility_timeout, worker_id, max_attempts]
+        )
+        if not items:
+            data = self.client.blmove(CONTENT_QUEUE, processing, timeout, "RIGHT", "LEFT")
+            if data is None:
+                return []
+            items = [data]
+        return self._decode_jobs(items, processing)
+    
+    def _decode_jobs(self, items: List[str], processing: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Decode queued payloads one by one, dead-lettering those that aren't JSON objects"""
+        jobs = []
+        malformed = []
+        for data in items:
+            try:
+                job = decode(data)
+                if not isinstance(job, dict):
+                    raise ValueError("payload is not a JSON object")
+                jobs.append(job)
+            except ValueError as e:
+                print(f"❌ Dead-lettering malformed queue item: {e}")
+                malformed.append(data)
+        
+        if malformed:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.lpush(DEAD_LETTER_QUEUE, *malformed)
+            if processing is not None:
+                for data in malformed:
+                    pipe.lrem(processing, 1, data)
+            pipe.execute()
+        return jobs
+    
+    def heartbeat(self, worker_id: str, visibility_timeout: int = VISIBILITY_TIMEOUT):
+        """Extend the lease on the worker's processing list"""
+        self.client.zadd(PROCESSING_LEASES, {worker_id: time.time() + visibility_timeout})
+    
+    def ack_batch(self, worker_id: str, content_ids: List[str]):
+        """Drop a finished batch from the worker's processing list"""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(f"{PROCESSING_QUEUE_PREFIX}{worker_id}")
+        if content_ids:
+            pipe.hdel(DELIVERY_ATTEMPTS, *content_ids)
+        pipe.execute()
+    
+    def release_worker(self, worker_id: str):
+        """Give up the lease of a worker shutting down with nothing in flight"""
+        if not self.client.llen(f"{PROCESSING_QUEUE_PREFIX}{worker_id}"):
+            self.client.zrem(PROCESSING_LEASES, worker_id)
+    
+    def requeue_expired(self, max_attempts: int = MAX_DELIVERY_ATTEMPTS) -> Dict[str, int]:
+        """Requeue jobs held by workers whose lease expired"""
+        requeued, dead = self._reap(
+            keys=[PROCESSING_LEASES, CONTENT_QUEUE, DELIVERY_ATTEMPTS, DEAD_LETTER_QUEUE],
+            args=[time.time(), max_attempts, PROCESSING_QUEUE_PREFIX]
+        )
+        return {"requeued": requeued, "dead_lettered": dead}
+    
     def store_result(self, content_id: str, result: Dict[str, Any]):
         """Store moderation result"""
         key = f"result:{content_id}"
-        self.client.setex(key, 3600, json.dumps(result))  # 1 hour TTL
-        self.client.lpush(RESULT_QUEUE, json.dumps(result))
+        payload = encode(result)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.setex(key, 3600, payload)  # 1 hour TTL
+        publish_result(pipe, payload)
+        pipe.execute()
+    
+    def store_results_batch(self, results: List[Dict[str, Any]], decisions: List[Dict[str, Any]]):
+        """Store a batch of results and decisions in one pipelined round trip"""
+        if not results and not decisions:
+            return
+        
+        # A decision is usually also its result, serialize it once for all three writes
+        payloads = serialize_once(results + decisions)
+        pipe = self.client.pipeline(transaction=False)
+        for result in results:
+            pipe.setex(f"result:{result['content_id']}", 3600, payloads[id(result)])
+            publish_result(pipe, payloads[id(result)])
+        for decision in decisions:
+            pipe.setex(f"decision:{decision['content_id']}", 86400, payloads[id(decision)])
+        pipe.execute()
     
     def get_result(self, content_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve moderation result"""
         key = f"result:{content_id}"
-        data = self.client.get(key)
+        data = self.client.execute_command("GET", key, **RAW)
         if data:
-            return json.loads(data)
+            return decode(data)
         return None
     
-    def track_user_posts(self, user_id: str, time_window: int = 60) -> int:
-        """Track user post frequency for spam detection"""
-        key = f"user_posts:{user_id}"
-        pipe = self.client.pipeline()
-        pipe.incr(key)
-        pipe.expire(key, time_window)
-        result = pipe.execute()
-        return result[0]
-    
-    def get_user_post_count(self, user_id: str) -> int:
-        """Get current user post count"""
-        key = f"user_posts:{user_id}"
-        count = self.client.get(key)
-        return int(count) if count else 0
+    def track_user_posts(self, user_id: str, time_window: int = SPAM_TIME_WINDOW) -> int:
+        """Record a post and return the user's posts in the sliding window"""
+        return self._window_count(
+            keys=[post_window_key(user_id)],
+            args=[1, time_window, bucket_size(time_window)]
+        )
+    
+    def get_user_post_count(self, user_id: str, time_window: int = SPAM_TIME_WINDOW) -> int:
+        """Get the user's posts in the sliding window"""
+        return self._window_count(
+            keys=[post_window_key(user_id)],
+            args=[0, time_window, bucket_size(time_window)]
+        )
+    
+    def get_user_post_counts(self, user_ids: List[str], time_window: int = SPAM_TIME_WINDOW) -> Dict[str, int]:
+        """Get several users' posts in the sliding window in one round trip"""
+        user_ids = list(dict.fromkeys(user_ids))
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            self._window_count(
+                keys=[post_window_key(user_id)],
+                args=[0, time_window, bucket_size(time_window)],
+                client=pipe
+            )
+        return dict(zip(user_ids, pipe.execute()))
     
     def store_decision(self, decision: Dict[str, Any]):
         """Store decision in database"""
         content_id = decision["content_id"]
         key = f"decision:{content_id}"
-        self.client.setex(key, 86400, json.dumps(decision))  # 24 hour TTL
+        self.client.setex(key, 86400, encode(decision))  # 24 hour TTL
     
     def get_decision(self, content_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve stored decision"""
         key = f"decision:{content_id}"
-        data = self.client.get(key)
+        data = self.client.execute_command("GET", key, **RAW)
         if data:
-            return json.loads(data)
+            return decode(data)
         return None
     
+    def get_cached_analysis(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Retrieve a cached content analysis"""
+        data = self.client.execute_command("GET", f"analysis_cache:{cache_key}", **RAW)
+        if data:
+            return decode(data)
+        return None
+    
+    def cache_analysis(self, cache_key: str, analysis: Dict[str, Any], ttl: int):
+        """Store a content analysis in the shared cache"""
+        self.client.setex(f"analysis_cache:{cache_key}", ttl, encode(analysis))
+    
+    def add_near_duplicate(self, entry_id: str, band_keys: List[str], entry: Dict[str, Any], window: int):
+        """Share a near-duplicate index entry, evicting bucket members older than window"""
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.setex(f"near_dup_entry:{entry_id}", window, encode(entry))
+        for band_key in band_keys:
+            bucket = f"near_dup:{band_key}"
+            pipe.zadd(bucket, {entry_id: now})
+            pipe.zremrangebyscore(bucket, "-inf", now - window)
+            pipe.expire(bucket, window)
+        pipe.execute()
+    
+    def refresh_near_duplicate(self, entry_id: str, band_keys: List[str], window: int):
+        """Restart the window of a shared near-duplicate entry that is still indexed"""
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.expire(f"near_dup_entry:{entry_id}", window)
+        for band_key in band_keys:
+            bucket = f"near_dup:{band_key}"
+            pipe.zadd(bucket, {entry_id: now}, xx=True)
+            pipe.expire(bucket, window)
+        pipe.execute()
+    
+    def get_near_duplicate_candidates(self, band_keys: List[str]) -> List[Dict[str, Any]]:
+        """Fetch shared index entries colliding with any of the band keys"""
+        pipe = self.client.pipeline(transaction=False)
+        for band_key in band_keys:
+            pipe.zrange(f"near_dup:{band_key}", 0, -1)
+        entry_ids = {entry_id for members in pipe.execute() for entry_id in members}
+        if not entry_ids:
+            return []
+        
+        entries = self.client.execute_command(
+            "MGET", *(f"near_dup_entry:{entry_id}" for entry_id in entry_ids), **RAW
+        )
+        return [decode(entry) for entry in entries if entry]
+    
     def ping(self) -> bool:
         """Check Redis connection"""
         try:
             return self.client.ping()
         except:
             return False
+
+
+class AsyncRedisClient:
+    """redis.asyncio counterpart of RedisClient for code running on an event loop
+    
+    All calls share the client's connection pool, which belongs to the event
+    loop it is first used on.
+    """
+    
+    def __init__(self, max_connections: int = REDIS_MAX_CONNECTIONS):
+        # Callers wait for a free connection instead of failing when the pool is busy
+        pool = aioredis.BlockingConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            decode_responses=True,
+            max_connections=max_connections
+        )
+        self.client = aioredis.Redis(connection_pool=pool)
+        self._submit = self.client.register_script(SUBMIT_SCRIPT)
+        self._window_count = self.client.register_script(WINDOW_COUNT_SCRIPT)
+    
+    async def submit_content(
+        self,
+        content_data: Dict[str, Any],
+        time_window: int = SPAM_TIME_WINDOW,
+        max_queue_depth: int = 0,
+        local_count: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Count the post and enqueue it with its count in one atomic round trip"""
+        submitted = await self.submit_batch([content_data], time_window, max_queue_depth, [local_count])
+        return {
+            "accepted": submitted["accepted"],
+            "post_count": submitted["post_counts"][0] if submitted["accepted"] else 0,
+            "queue_depth": submitted["queue_depth"]
+        }
+    
+    async def submit_batch(
+        self,
+        contents: List[Dict[str, Any]],
+        time_window: int = SPAM_TIME_WINDOW,
+        max_queue_depth: int = 0,
+        local_counts: Optional[List[Optional[int]]] = None
+    ) -> Dict[str, Any]:
+        """Count and enqueue a batch of posts in order, in one atomic round trip
+        
+        Each payload is serialized with a unique placeholder for
+        metadata.recent_post_count, which the script replaces with the count.
+        Posts with a local count (hot users counted in-process) are not
+        counted in Redis and get that count instead.
+        """
+        keys = [CONTENT_QUEUE]
+        args = [time_window, max_queue_depth, bucket_size(time_window)]
+        for content_data, local_count in zip(contents, local_counts or [None] * len(contents)):
+            placeholder = f"__recent_post_count_{uuid.uuid4().hex}__"
+            payload = {
+                **content_data,
+                "metadata": {**content_data.get("metadata", {}), "recent_post_count": placeholder}
+            }
+            keys.append(post_window_key(content_data['user_id']))
+            args.append(local_count or 0)
+            args.extend(encode_json(payload).split(encode_json(placeholder), 1))
+        
+        result = await self._submit(keys=keys, args=args)
+        return {
+            "accepted": bool(result[0]),
+            "queue_depth": result[1],
+            "post_counts": result[2:]
+        }
+    
+    async def enqueue_content(self, content_data: Dict[str, Any]) -> str:
+        """Add content to moderation queue"""
+        await self.client.lpush(CONTENT_QUEUE, encode_json(content_data))
+        return content_data["content_id"]
+    
+    async def store_result(self, content_id: str, result: Dict[str, Any]):
+        """Store moderation result"""
+        payload = encode(result)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.setex(f"result:{content_id}", 3600, payload)  # 1 hour TTL
+        publish_result(pipe, payload)
+        await pipe.execute()
+    
+    async def store_results_batch(self, results: List[Dict[str, Any]], decisions: List[Dict[str, Any]]):
+        """Store a batch of results and decisions in one pipelined round trip"""
+        if not results and not decisions:
+            return
+        
+        # A decision is usually also its result, serialize it once for all three writes
+        payloads = serialize_once(results + decisions)
+        pipe = self.client.pipeline(transaction=False)
+        for result in results:
+            pipe.setex(f"result:{result['content_id']}", 3600, payloads[id(result)])
+            publish_result(pipe, payloads[id(result)])
+        for decision in decisions:
+            pipe.setex(f"decision:{decision['content_id']}", 86400, payloads[id(decision)])
+        await pipe.execute()
+    
+    async def track_user_posts(self, user_id: str, time_window: int = SPAM_TIME_WINDOW) -> int:
+        """Record a post and return the user's posts in the sliding window"""
+        return await self._window_count(
+            keys=[post_window_key(user_id)],
+            args=[1, time_window, bucket_size(time_window)]
+        )
+    
+    async def get_user_post_count(self, user_id: str, time_window: int = SPAM_TIME_WINDOW) -> int:
+        """Get the user's posts in the sliding window"""
+        return await self._window_count(
+            keys=[post_window_key(user_id)],
+            args=[0, time_window, bucket_size(time_window)]
+        )
+    
+    async def add_user_posts(self, counts: Dict[str, int], time_window: int = SPAM_TIME_WINDOW):
+        """Add posts counted elsewhere to users' sliding windows in one round trip"""
+        if not counts:
+            return
+        
+        pipe = self.client.pipeline(transaction=False)
+        for user_id, count in counts.items():
+            await self._window_count(
+                keys=[post_window_key(user_id)],
+                args=[count, time_window, bucket_size(time_window)],
+                client=pipe
+            )
+        await pipe.execute()
+    
+    async def store_decision(self, decision: Dict[str, Any]):
+        """Store decision in database"""
+        await self.client.setex(f"decision:{decision['content_id']}", 86400, encode(decision))  # 24 hour TTL
+    
+    async def get_result(self, content_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve moderation result"""
+        data = await self.client.execute_command("GET", f"result:{content_id}", **RAW)
+        if data:
+            return decode(data)
+        return None
+    
+    async def get_decision(self, content_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve stored decision"""
+        data = await self.client.execute_command("GET", f"decision:{content_id}", **RAW)
+        if data:
+            return decode(data)
+        return None
+    
+    async def ping(self) -> bool:
+        """Check Redis connection"""
+        try:
+            return await self.client.ping()
+        except Exception:
+            return False
+    
+    async def close(self):
+        """Close the connection pool"""
+        await self.client.aclose(close_connection_pool=True)
@@ -0,0 +1,100 @@
+from threading import Lock
+from typing import Optional
+import os
+
+import anthropic
+import httpx
+
+from config import (
+    ANTHROPIC_API_KEY, LLM_MAX_CONNECTIONS, LLM_KEEPALIVE_CONNECTIONS, LLM_KEEPALIVE_EXPIRY, LLM_TIMEOUT
+)
+from moderation_graph import ModerationWorkflow
+from redis_client import RedisClient
+
+# Process-wide clients and workflow, created on first use. The graph is
+# compiled once and LLM calls reuse kept-alive connections instead of
+# paying a TLS handshake per request.
+_lock = Lock()
+_llm_client: Optional[anthropic.Anthropic] = None
+_async_llm_client: Optional[anthropic.AsyncAnthropic] = None
+_redis_client: Optional[RedisClient] = None
+_workflow: Optional[ModerationWorkflow] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+    )
+
+
+def get_llm_client() -> Optional[anthropic.Anthropic]:
+    """Shared Anthropic client if an API key is set"""
+    global _llm_client
+    if not ANTHROPIC_API_KEY:
+        return None
+    with _lock:
+        if _llm_client is None:
+            # The workflow retries the same errors the SDK would, with jittered backoff.
+            # The SDK's 600s default timeout would outlast a pool child's heartbeat.
+            _llm_client = anthropic.Anthropic(
+                api_key=ANTHROPIC_API_KEY,
+                max_retries=0,
+                timeout=LLM_TIMEOUT,
+                http_client=anthropic.DefaultHttpxClient(limits=_limits())
+            )
+        return _llm_client
+
+
+def get_async_llm_client() -> Optional[anthropic.AsyncAnthropic]:
+    """Shared async Anthropic client if an API key is set
+
+    Its connection pool belongs to the event loop that first uses it, so
+    only use it from that one loop.
+    """
+    global _async_llm_client
+    if not ANTHROPIC_API_KEY:
+        return None
+    with _lock:
+        if _async_llm_client is None:
+            _async_llm_client = anthropic.AsyncAnthropic(
+                api_key=ANTHROPIC_API_KEY,
+                max_retries=0,
+                timeout=LLM_TIMEOUT,
+                http_client=anthropic.DefaultAsyncHttpxClient(limits=_limits())
+            )
+        return _async_llm_client
+
+
+def get_redis_client() -> RedisClient:
+    """Shared blocking Redis client"""
+    global _redis_client
+    with _lock:
+        if _redis_client is None:
+            _redis_client = RedisClient()
+        return _redis_client
+
+
+def get_workflow() -> ModerationWorkflow:
+    """Shared workflow using the shared LLM and Redis clients"""
+    global _workflow
+    if _workflow is None:
+        llm_client = get_llm_client()
+        redis_client = get_redis_client()
+        with _lock:
+            if _workflow is None:
+                _workflow = ModerationWorkflow(llm_client, redis_client=redis_client)
+    return _workflow
+
+
+def reset():
+    """Forget every shared object, e.g. in a forked child"""
+    global _lock, _llm_client, _async_llm_client, _redis_client, _workflow
+    _lock = Lock()
+    _llm_client = _async_llm_client = _redis_client = _workflow = None
+
+
+# Sockets inherited over fork can't be shared with the parent
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset)
@@ -0,0 +1,141 @@
+from typing import Dict, Any, List, Tuple, Callable, Optional
+import socket
+import sys
+import time
+
+import redis
+
+from codec import decode
+from config import (
+    RESULT_STREAM, RESULT_BATCH_SIZE, RESULT_CLAIM_IDLE_MS, STREAM_MAINTENANCE_INTERVAL
+)
+from redis_client import RedisClient, RAW
+
+
+class ResultConsumer:
+    """Reads moderation results from the result stream through a consumer group
+
+    Every group sees every result, so each downstream service (analytics,
+    notifications, ...) uses its own group, and the consumers of one group
+    split its results. A result stays pending until ack() checkpoints it.
+    After a restart under the same consumer name, read() hands back the
+    unacked results first; results left pending by consumers that never
+    come back are taken over by reclaim().
+
+    The stream is capped at about RESULT_STREAM_MAXLEN results, so a group
+    lagging further behind than that loses the oldest ones.
+    """
+
+    def __init__(
+        self,
+        group: str,
+        consumer: Optional[str] = None,
+        redis_client: Optional[RedisClient] = None,
+        stream: str = RESULT_STREAM,
+        batch_size: int = RESULT_BATCH_SIZE,
+        start_id: str = "0"
+    ):
+        self.group = group
+        self.consumer = consumer or socket.gethostname()
+        self.client = (redis_client or RedisClient()).client
+        self.stream = stream
+        self.batch_size = batch_size
+        # Pending entries of this consumer are re-read from here before new ones
+        self._backlog_id: Optional[str] = "0"
+        self._claim_id = "0-0"
+        self.create_group(start_id)
+
+    def create_group(self, start_id: str = "0"):
+        """Create the group (and stream) if they don't exist, starting after start_id"""
+        try:
+            self.client.xgroup_create(self.stream, self.group, id=start_id, mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def read(self, block_ms: int = 5000) -> List[Tuple[str, Dict[str, Any]]]:
+        """Up to batch_size (entry id, result) pairs, blocking while there are none"""
+        if self._backlog_id is not None:
+            response = self.client.execute_command(
+                "XREADGROUP", "GROUP", self.group, self.consumer, "COUNT", self.batch_size,
+                "STREAMS", self.stream, self._backlog_id, **RAW
+            )
+            entries = response[0][1] if response else []
+            if entries:
+                self._backlog_id = entries[-1][0].decode()
+                return self._decode(entries)
+            self._backlog_id = None
+
+        response = self.client.execute_command(
+            "XREADGROUP", "GROUP", self.group, self.consumer, "COUNT", self.batch_size,
+            "BLOCK", block_ms, "STREAMS", self.stream, ">", **RAW
+        )
+        return self._decode(response[0][1]) if response else []
+
+    def reclaim(self, min_idle_ms: int = RESULT_CLAIM_IDLE_MS) -> List[Tuple[str, Dict[str, Any]]]:
+        """Take over the next batch of results idle in other consumers' pending lists"""
+        response = self.client.execute_command(
+            "XAUTOCLAIM", self.stream, self.group, self.consumer, min_idle_ms,
+            self._claim_id, "COUNT", self.batch_size, **RAW
+        )
+        # A cursor of 0-0 means the scan wrapped around
+        self._claim_id = response[0].decode()
+        return self._decode(response[1])
+
+    def ack(self, entry_ids: List[str]) -> int:
+        """Checkpoint results so they are never delivered to the group again"""
+        if not entry_ids:
+            return 0
+        return self.client.xack(self.stream, self.group, *entry_ids)
+
+    def run(self, handler: Callable[[List[Dict[str, Any]]], None], block_ms: int = 5000):
+        """Hand batches of results to handler, acking each batch once it returns
+
+        Delivery is at least once: if handler raises, the batch stays
+        pending and comes back on the next start.
+        """
+        next_reclaim = 0.0
+        while True:
+            batch = []
+            if time.monotonic() >= next_reclaim:
+                batch = self.reclaim()
+                if self._claim_id == "0-0":
+                    next_reclaim = time.monotonic() + STREAM_MAINTENANCE_INTERVAL
+            batch = batch or self.read(block_ms)
+            if batch:
+                handler([result for _, result in batch])
+                self.ack([entry_id for entry_id, _ in batch])
+
+    def _decode(self, entries) -> List[Tuple[str, Dict[str, Any]]]:
+        results = []
+        unreadable = []
+        for entry_id, fields in entries:
+            entry_id = entry_id.decode()
+            try:
+                # Entries trimmed while pending come back without fields
+                results.append((entry_id, decode(fields[b"data"])))
+            except Exception as e:
+                # Redelivery can't fix these, checkpoint past them
+                print(f"❌ Skipping result {entry_id}: {e}")
+                unreadable.append(entry_id)
+        self.ack(unreadable)
+        return results
+
+
+def main():
+    """Print results as they arrive, as consumer group argv[1] (default "printer")"""
+    consumer = ResultConsumer(sys.argv[1] if len(sys.argv) > 1 else "printer")
+    print(f"✅ Consuming {consumer.stream} as {consumer.group}/{consumer.consumer}")
+
+    def show(results: List[Dict[str, Any]]):
+        for result in results:
+            print(f"{result['content_id']}: {result.get('action')} ({result.get('severity')})")
+
+    consumer.run(show)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nStopping result consumer...")
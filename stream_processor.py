@@ -1,101 +1,239 @@
-
 import asyncio
-from redis_client import RedisClient
+from redis_client import AsyncRedisClient
+from codec import decode
 from moderation_graph import ModerationWorkflow
-from typing import Dict, Any
-import json
+from worker import build_decision, build_error_result
+from registry import get_workflow
+from config import (
+    CONTENT_STREAM, STREAM_GROUP, STREAM_BATCH_SIZE, STREAM_CONCURRENCY,
+    STREAM_CLAIM_IDLE_MS, STREAM_MAXLEN, STREAM_MAX_AGE, STREAM_MAINTENANCE_INTERVAL,
+    STREAM_MAX_DELIVERIES, STREAM_DEAD_LETTER
+)
+from typing import Dict, Any, List, Optional
+import time
 from datetime import datetime
+import redis
 
 class StreamProcessor:
-    
-    
-    def __init__(self, stream_name: str = "content_stream"):
+    """Consumes a Redis stream through a consumer group on one event loop
+
+    Each XREADGROUP batch is moderated concurrently, up to concurrency
+    messages at a time. Its results are stored in one pipeline and its
+    entries acked with a single XACK. On a schedule, entries left pending by
+    dead consumers are reclaimed with XAUTOCLAIM and the stream is trimmed.
+    Reclaimed entries already delivered max_deliveries times are moved to
+    STREAM_DEAD_LETTER instead of being processed again.
+    """
+
+    def __init__(
+        self,
+        stream_name: str = CONTENT_STREAM,
+        workflow: Optional[ModerationWorkflow] = None,
+        redis_client: Optional[AsyncRedisClient] = None,
+        concurrency: int = STREAM_CONCURRENCY,
+        batch_size: int = STREAM_BATCH_SIZE,
+        max_deliveries: int = STREAM_MAX_DELIVERIES
+    ):
         self.stream_name = stream_name
-        self.redis_client = RedisClient()
-        self.workflow = ModerationWorkflow()
-        self.consumer_group = "moderators"
+        self.redis_client = redis_client or AsyncRedisClient()
+        self.workflow = workflow or get_workflow()
+        self.consumer_group = STREAM_GROUP
         self.consumer_name = f"consumer_{datetime.utcnow().timestamp()}"
-        
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_deliveries = max_deliveries
+
     async def create_consumer_group(self):
-        
+        """Create the consumer group and stream if they don't exist yet"""
         try:
-            self.redis_client.client.xgroup_create(
-                self.stream_name, 
-                self.consumer_group, 
-                id='0', 
+            await self.redis_client.client.xgroup_create(
+                self.stream_name,
+                self.consumer_group,
+                id='0',
                 mkstream=True
             )
-        except:
-            pass  # Group already exists
-    
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
     async def process_stream(self):
-        
+        """Read, moderate and ack batches until cancelled"""
         await self.create_consumer_group()
         print(f"Stream processor started for {self.stream_name}")
-        
-        last_id = '>'
-        
+
+        next_maintenance = 0.0
+
         while True:
             try:
-                # Read from stream
-                messages = self.redis_client.client.xreadgroup(
+                if time.monotonic() >= next_maintenance:
+                    await self.maintain()
+                    next_maintenance = time.monotonic() + STREAM_MAINTENANCE_INTERVAL
+
+                # XREADGROUP blocks while the stream is idle, no extra sleep needed
+                messages = await self.redis_client.client.xreadgroup(
                     self.consumer_group,
                     self.consumer_name,
-                    {self.stream_name: last_id},
-                    count=10,
+                    {self.stream_name: '>'},
+                    count=self.batch_size,
                     block=1000
                 )
-                
-                if messages:
-                    for stream_name, stream_messages in messages:
-                        for msg_id, msg_data in stream_messages:
-                            await self.process_message(msg_id, msg_data)
-                
-                await asyncio.sleep(0.1)
-                
-            except KeyboardInterrupt:
-                print("\nStopping stream processor...")
-                break
+
+                for stream_name, stream_messages in messages or []:
+                    await self.process_batch(stream_messages)
+
             except Exception as e:
                 print(f"Stream processing error: {e}")
                 await asyncio.sleep(5)
-    
-    async def process_message(self, msg_id: str, msg_data: Dict[str, Any]):
-        """Process a single message"""
-        try:
-            # Decode message
-            content_data = json.loads(msg_data.get('data', '{}'))
-            
-            print(f"Processing stream message: {content_data.get('content_id')}")
-            
-            # Process through workflow
-            result = self.workflow.process_content(content_data)
-            
-            # Store result
-            self.redis_client.store_result(
-                content_data['content_id'],
-                {
-                    "content_id": result.content_id,
-                    "severity": result.severity,
-                    "action": result.action,
-                    "rationale": result.rationale
-                }
-            )
-            
-            # Acknowledge message
-            self.redis_client.client.xack(
+
+    async def maintain(self):
+        """Reclaim stale pending entries and trim the stream"""
+        reclaimed = await self.reclaim_pending()
+        trimmed = await self.trim_stream()
+        if reclaimed or trimmed:
+            print(f"Stream maintenance: reclaimed {reclaimed}, trimmed {trimmed}")
+
+    async def reclaim_pending(self) -> int:
+        """Take over and process entries idle in other consumers' pending lists"""
+        client = self.redis_client.client
+        start_id = "0-0"
+        reclaimed = 0
+
+        while True:
+            response = await client.xautoclaim(
                 self.stream_name,
                 self.consumer_group,
-                msg_id
+                self.consumer_name,
+                min_idle_time=STREAM_CLAIM_IDLE_MS,
+                start_id=start_id,
+                count=self.batch_size
             )
-            
-        except Exception as e:
-            print(f"Error processing message {msg_id}: {e}")
+            start_id, claimed = response[0], response[1]
+
+            # Entries trimmed while pending come back without data on Redis 6.2
+            trimmed = [msg_id for msg_id, msg_data in claimed if not msg_data]
+            if trimmed:
+                await client.xack(self.stream_name, self.consumer_group, *trimmed)
+
+            live = await self.dead_letter_exhausted(
+                [(msg_id, msg_data) for msg_id, msg_data in claimed if msg_data]
+            )
+            if live:
+                await self.process_batch(live)
+                reclaimed += len(live)
+
+            if start_id == "0-0":
+                return reclaimed
+
+    async def dead_letter_exhausted(self, claimed):
+        """Dead-letter and ack claimed entries delivered too often, return the rest
+
+        An entry that keeps crashing the workflow or failing to store would
+        otherwise be reclaimed, and sent to the LLM, forever.
+        """
+        if not claimed:
+            return []
+        client = self.redis_client.client
+
+        # The claim itself counts as a delivery
+        pipe = client.pipeline(transaction=False)
+        for msg_id, _ in claimed:
+            pipe.xpending_range(self.stream_name, self.consumer_group, min=msg_id, max=msg_id, count=1)
+        pending = await pipe.execute()
+
+        live = []
+        exhausted = []
+        for (msg_id, msg_data), entry in zip(claimed, pending):
+            if entry and entry[0]["times_delivered"] > self.max_deliveries:
+                exhausted.append((msg_id, msg_data))
+            else:
+                live.append((msg_id, msg_data))
+
+        if exhausted:
+            pipe = client.pipeline(transaction=True)
+            pipe.lpush(STREAM_DEAD_LETTER, *[msg_data.get('data', '') for _, msg_data in exhausted])
+            pipe.xack(self.stream_name, self.consumer_group, *[msg_id for msg_id, _ in exhausted])
+            await pipe.execute()
+            print(f"❌ Dead-lettered {len(exhausted)} stream entries after {self.max_deliveries} deliveries")
+        return live
+
+    async def trim_stream(self) -> int:
+        """Cap the stream by age when STREAM_MAX_AGE is set, by length otherwise"""
+        client = self.redis_client.client
+        if STREAM_MAX_AGE:
+            min_id = f"{int((time.time() - STREAM_MAX_AGE) * 1000)}-0"
+            return await client.xtrim(self.stream_name, minid=min_id, approximate=True)
+        return await client.xtrim(self.stream_name, maxlen=STREAM_MAXLEN, approximate=True)
+
+    async def process_batch(self, stream_messages):
+        """Moderate one read's messages, then store and ack them together"""
+        decoded = []
+        malformed = []
+        for msg_id, msg_data in stream_messages:
+            try:
+                content_data = decode(msg_data.get('data', '{}'))
+                if not isinstance(content_data, dict):
+                    raise ValueError("message data is not a JSON object")
+                decoded.append((msg_id, content_data))
+            except Exception as e:
+                # Redelivery can't fix a malformed entry, ack it below
+                print(f"Error decoding message {msg_id}: {e}")
+                malformed.append(msg_id)
+
+        outcomes = await self._moderate([content_data for _, content_data in decoded])
+
+        results = []
+        decisions = []
+        for (msg_id, content_data), outcome in zip(decoded, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Error processing message {msg_id}: {outcome}")
+                results.append(build_error_result(content_data, outcome))
+                continue
+
+            decision = build_decision(outcome).model_dump(mode='json')
+            results.append(decision)
+            decisions.append(decision)
+
+        # Entries stay pending, and are reclaimed later, if storing fails
+        await self.redis_client.store_results_batch(results, decisions)
+
+        msg_ids = [msg_id for msg_id, _ in decoded] + malformed
+        if msg_ids:
+            await self.redis_client.client.xack(self.stream_name, self.consumer_group, *msg_ids)
+
+    async def _moderate(self, payloads: List[Dict[str, Any]]) -> List[Any]:
+        """Run the workflow over a batch, returning a state or an exception per item"""
+        if not payloads:
+            return []
+
+        if not self.workflow.llm_client and not self.workflow.async_llm_client:
+            # Vectorized rule-based path, kept off the event loop
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(None, self.workflow.process_batch, payloads)
+            except Exception as e:
+                print(f"Batch processing failed, retrying items individually: {e}")
+
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def moderate(content_data: Dict[str, Any]):
+            async with slots:
+                try:
+                    return await self.workflow.aprocess_content(content_data)
+                except Exception as e:
+                    return e
+
+        return await asyncio.gather(*(moderate(content_data) for content_data in payloads))
 
 async def main():
     """Run stream processor"""
     processor = StreamProcessor()
-    await processor.process_stream()
+    try:
+        await processor.process_stream()
+    finally:
+        await processor.redis_client.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nStopping stream processor...")
@@ -2,6 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from api import app
 from redis_client import RedisClient
+import json
 import time
 
 client = TestClient(app)
@@ -94,3 +95,648 @@ def test_user_stats():
     data = response.json()
     assert "user_id" in data
     assert "recent_post_count" in data
+
+def test_worker_batch_stores_every_result():
+    """Test that a worker batch stores results and decisions, including failures"""
+    from moderation_graph import ModerationWorkflow
+    from worker import process_content_job
+    
+    batch = [
+        {
+            "content_id": f"batch-test-{i}",
+            "user_id": "batch-user",
+            "content": content,
+            "content_type": "text",
+            "metadata": {}
+        }
+        for i, content in enumerate(["Have a nice day", "You are an idiot"])
+    ]
+    batch.append({"content_id": "batch-test-invalid"})
+    
+    process_content_job(ModerationWorkflow(), redis_client, batch)
+    
+    assert redis_client.get_decision("batch-test-0")["action"] == "approve"
+    assert redis_client.get_result("batch-test-1")["content_id"] == "batch-test-1"
+    assert redis_client.get_result("batch-test-invalid")["detected_issues"] == ["processing_error"]
+    assert redis_client.get_decision("batch-test-invalid") is None
+
+def test_worker_llm_batch_stores_each_result_as_it_finishes():
+    """Test that an LLM batch stores every result and beats progress before the next item"""
+    from moderation_graph import ModerationWorkflow
+    from worker import process_content_job
+    
+    batch = [
+        {"content_id": f"llm-batch-test-{i}", "user_id": "llm-batch-user", "content": f"Post number {i}",
+         "content_type": "text", "metadata": {}}
+        for i in range(3)
+    ]
+    stored_before_call = []
+    beats = []
+    
+    class FakeLLMClient:
+        def __init__(self):
+            self.messages = self
+        
+        def create(self, **kwargs):
+            stored_before_call.append(sum(
+                redis_client.get_result(job["content_id"]) is not None for job in batch
+            ))
+            block = type("Block", (), {"text": '{"toxicity_score": 0.0, "spam_score": 0.0, '
+                                               '"sarcasm_score": 0.0, "detected_issues": [], "analysis": "ok"}'})()
+            return type("Response", (), {"content": [block]})()
+    
+    for job in batch:
+        redis_client.client.delete(f"result:{job['content_id']}")
+    process_content_job(ModerationWorkflow(llm_client=FakeLLMClient()), redis_client, batch, lambda: beats.append(1))
+    
+    assert stored_before_call == [0, 1, 2]
+    assert len(beats) == 3
+    assert redis_client.get_decision("llm-batch-test-2")["action"] == "approve"
+
+def stuck_child(index, threads, heartbeat, reliable):
+    """Pool child that never beats"""
+    time.sleep(60)
+
+def crashing_child(index, threads, heartbeat, reliable):
+    """Pool child that fails on startup"""
+    raise SystemExit(1)
+
+def stubborn_child(index, threads, heartbeat, reliable):
+    """Pool child that ignores SIGTERM"""
+    import signal
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    heartbeat.value = 0.0
+    time.sleep(60)
+
+def test_worker_pool_restarts_stuck_children():
+    """Test that a child that stops heartbeating is killed and replaced after a delay"""
+    import signal
+    from worker import WorkerPool
+    
+    pool = WorkerPool(1, 1, heartbeat_timeout=0.2, restart_base_delay=0.2, target=stuck_child)
+    pool._spawn(0)
+    stuck = pool.children[0][0]
+    
+    time.sleep(0.3)
+    pool._check()
+    assert stuck.exitcode == -signal.SIGKILL and pool.restarts == 1
+    
+    pool._check()
+    assert pool.children[0][0] is stuck
+    
+    time.sleep(0.2)
+    pool._check()
+    assert pool.children[0][0] is not stuck and pool.children[0][0].is_alive()
+    pool._drain()
+
+def test_worker_pool_backs_off_crash_loops():
+    """Test that a child crashing on startup is restarted with a doubling delay"""
+    from worker import WorkerPool
+    
+    pool = WorkerPool(1, 1, restart_base_delay=0.1, target=crashing_child)
+    pool._spawn(0)
+    
+    delays = []
+    for _ in range(3):
+        pool.children[0][0].join(5)
+        before = time.monotonic()
+        pool._check()
+        delays.append(pool._respawn_at[0] - before)
+        time.sleep(delays[-1])
+        pool._check()
+    
+    assert [round(delay, 1) for delay in delays] == [0.1, 0.2, 0.4]
+    assert pool.restarts == 3
+    pool._drain()
+
+def test_worker_pool_drains_on_sigterm():
+    """Test that SIGTERM lets a child's consumers finish, and kills children that don't stop"""
+    import signal
+    from worker import WorkerPool
+    
+    pool = WorkerPool(1, 2, reliable=False, drain_timeout=15)
+    pool._spawn(0)
+    child, heartbeat = pool.children[0]
+    spawned = heartbeat.value
+    
+    # The heartbeat moves once the consumers are looping
+    deadline = time.monotonic() + 15
+    while heartbeat.value <= spawned and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert heartbeat.value > spawned
+    
+    pool._drain()
+    assert child.exitcode == 0
+    
+    stubborn = WorkerPool(1, 1, drain_timeout=0.5, target=stubborn_child)
+    stubborn._spawn(0)
+    child, heartbeat = stubborn.children[0]
+    deadline = time.monotonic() + 15
+    while heartbeat.value != 0.0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    
+    stubborn._drain()
+    assert child.exitcode == -signal.SIGKILL
+
+def test_reliable_queue_requeues_expired_claims():
+    """Test that jobs claimed by a worker that stopped heartbeating are requeued"""
+    from config import CONTENT_QUEUE, DELIVERY_ATTEMPTS
+    from codec import encode_json
+    
+    job = {
+        "content_id": "reliable-test-1",
+        "user_id": "reliable-user",
+        "content": "Hello there",
+        "content_type": "text",
+        "metadata": {}
+    }
+    redis_client.enqueue_content(job)
+    
+    # A negative visibility timeout leaves the lease expired right away
+    claimed = redis_client.claim_batch("test-reliable-worker", 100, timeout=1, visibility_timeout=-1)
+    assert job in claimed
+    
+    assert redis_client.requeue_expired()["requeued"] >= 1
+    assert redis_client.client.hget(DELIVERY_ATTEMPTS, "reliable-test-1") == "1"
+    
+    queued = [json.loads(data) for data in redis_client.client.lrange(CONTENT_QUEUE, 0, -1)]
+    assert job in queued
+    
+    redis_client.client.lrem(CONTENT_QUEUE, 0, encode_json(job))
+    redis_client.client.hdel(DELIVERY_ATTEMPTS, "reliable-test-1")
+
+def test_batch_progress_extends_the_lease():
+    """Test that progress during a long batch keeps it from being requeued"""
+    from config import PROCESSING_QUEUE_PREFIX
+    from worker import batch_progress
+    
+    job = {"content_id": "lease-test-1", "user_id": "lease-user", "content": "Slow one", "content_type": "text"}
+    redis_client.enqueue_content(job)
+    assert job in redis_client.claim_batch("test-lease-worker", 100, timeout=1, visibility_timeout=-1)
+    
+    beats = []
+    batch_progress(redis_client, lambda: beats.append(1), "test-lease-worker")()
+    
+    assert beats == [1]
+    redis_client.requeue_expired()
+    assert redis_client.client.llen(f"{PROCESSING_QUEUE_PREFIX}test-lease-worker") >= 1
+    redis_client.ack_batch("test-lease-worker", ["lease-test-1"])
+    redis_client.release_worker("test-lease-worker")
+
+def test_reliable_queue_dead_letters_poison_batches():
+    """Test that a batch failing on every claim, and unparsable claimed items, are dead-lettered"""
+    import uuid
+    from config import PROCESSING_QUEUE_PREFIX, DEAD_LETTER_QUEUE, DELIVERY_ATTEMPTS
+    
+    worker_id = f"test-poison-worker-{uuid.uuid4().hex}"
+    job = {"content_id": f"poison-{worker_id}", "user_id": "poison-user", "content": "Boom", "content_type": "text"}
+    redis_client.enqueue_content(job)
+    
+    # The worker never acks, so every claim hands the same batch back
+    claims = [redis_client.claim_batch(worker_id, 1, timeout=1, max_attempts=3) for _ in range(3)]
+    assert all(claim == [job] for claim in claims)
+    redis_client.claim_batch(worker_id, 1, timeout=1, max_attempts=3)
+    
+    dead = [json.loads(data) for data in redis_client.client.lrange(DEAD_LETTER_QUEUE, 0, -1)]
+    assert job in dead
+    assert redis_client.client.hget(DELIVERY_ATTEMPTS, job["content_id"]) is None
+    redis_client.client.delete(f"{PROCESSING_QUEUE_PREFIX}{worker_id}")
+    redis_client.release_worker(worker_id)
+    
+    # An item that isn't JSON doesn't abort the reap of other expired workers
+    redis_client.client.lpush(f"{PROCESSING_QUEUE_PREFIX}{worker_id}", "{not json")
+    redis_client.heartbeat(worker_id, visibility_timeout=-1)
+    assert redis_client.requeue_expired()["dead_lettered"] >= 1
+    assert "{not json" in redis_client.client.lrange(DEAD_LETTER_QUEUE, 0, -1)
+    
+    redis_client.client.lrem(DEAD_LETTER_QUEUE, 0, "{not json")
+    for data in redis_client.client.lrange(DEAD_LETTER_QUEUE, 0, -1):
+        if job["content_id"] in data:
+            redis_client.client.lrem(DEAD_LETTER_QUEUE, 0, data)
+
+def test_stream_processor_stores_full_decisions():
+    """Test that a stream batch is stored as full decisions and acked in bulk"""
+    import asyncio
+    from stream_processor import StreamProcessor
+    
+    async def run():
+        processor = StreamProcessor("test_content_stream")
+        client = processor.redis_client.client
+        try:
+            await client.delete("test_content_stream")
+            await processor.create_consumer_group()
+            for i in range(3):
+                await client.xadd("test_content_stream", {"data": json.dumps({
+                    "content_id": f"stream-test-{i}",
+                    "user_id": "stream-user",
+                    "content": "Looking forward to the weekend",
+                    "content_type": "text",
+                    "metadata": {}
+                })})
+            
+            messages = await client.xreadgroup(
+                processor.consumer_group,
+                processor.consumer_name,
+                {"test_content_stream": ">"},
+                count=10
+            )
+            await processor.process_batch(messages[0][1])
+            
+            pending = await client.xpending("test_content_stream", processor.consumer_group)
+            return pending["pending"]
+        finally:
+            await client.delete("test_content_stream")
+            await processor.redis_client.close()
+    
+    assert asyncio.run(run()) == 0
+    decision = redis_client.get_decision("stream-test-2")
+    assert decision["status"] == "completed"
+    assert "detected_issues" in decision and "language" in decision
+
+def test_stream_processor_dead_letters_redelivered_entries():
+    """Test that reclaimed entries past the delivery cap are dead-lettered instead of reprocessed"""
+    import asyncio
+    from config import STREAM_CLAIM_IDLE_MS, STREAM_DEAD_LETTER
+    from stream_processor import StreamProcessor
+    
+    def job(content_id):
+        return json.dumps({
+            "content_id": content_id,
+            "user_id": "stream-user",
+            "content": "Looking forward to the weekend",
+            "content_type": "text",
+            "metadata": {}
+        })
+    
+    async def run():
+        processor = StreamProcessor("test_content_stream", max_deliveries=3)
+        client = processor.redis_client.client
+        try:
+            await client.delete("test_content_stream")
+            await processor.create_consumer_group()
+            poison = await client.xadd("test_content_stream", {"data": job("stream-poison")})
+            healthy = await client.xadd("test_content_stream", {"data": job("stream-healthy")})
+            
+            # A consumer that died on both, after the poison entry was already redelivered twice
+            await client.xreadgroup(processor.consumer_group, "gone-consumer", {"test_content_stream": ">"}, count=10)
+            await client.xclaim("test_content_stream", processor.consumer_group, "gone-consumer", 0, [poison])
+            for msg_id in (poison, healthy):
+                await client.xclaim(
+                    "test_content_stream", processor.consumer_group, "gone-consumer", 0, [msg_id],
+                    idle=STREAM_CLAIM_IDLE_MS * 2
+                )
+            
+            reclaimed = await processor.reclaim_pending()
+            pending = await client.xpending("test_content_stream", processor.consumer_group)
+            dead = await client.lrange(STREAM_DEAD_LETTER, 0, -1)
+            return reclaimed, pending["pending"], dead
+        finally:
+            await client.delete("test_content_stream")
+            await client.lrem(STREAM_DEAD_LETTER, 0, job("stream-poison"))
+            await processor.redis_client.close()
+    
+    redis_client.client.delete("result:stream-poison", "result:stream-healthy")
+    reclaimed, pending, dead = asyncio.run(run())
+    
+    assert reclaimed == 1 and pending == 0
+    assert job("stream-poison") in dead
+    assert redis_client.get_result("stream-healthy") is not None
+    assert redis_client.get_result("stream-poison") is None
+
+def test_requests_share_startup_redis_pool():
+    """Test that the pool opened at startup serves every request"""
+    import api
+    
+    with TestClient(app) as lifespan_client:
+        shared = api.redis_client
+        assert shared is not None
+        
+        assert lifespan_client.get("/health").status_code == 200
+        assert lifespan_client.get("/stats/user/pool-user").status_code == 200
+        assert api.redis_client is shared
+
+def test_appeals_reuse_shared_workflow(monkeypatch):
+    """Test that appeals run on one process-wide workflow instead of building one each"""
+    import uuid
+    import registry
+    from models import ModerationDecision, ModerationAction
+    
+    built = []
+    
+    class CountingWorkflow(registry.ModerationWorkflow):
+        def __init__(self, *args, **kwargs):
+            built.append(self)
+            super().__init__(*args, **kwargs)
+    
+    registry.reset()
+    monkeypatch.setattr(registry, "ModerationWorkflow", CountingWorkflow)
+    
+    content_ids = []
+    for _ in range(2):
+        decision = ModerationDecision(
+            content_id=f"appeal-{uuid.uuid4().hex}",
+            user_id="appeal-user",
+            content="You are an idiot",
+            severity=0.9,
+            action=ModerationAction.SUSPEND,
+            rationale="Toxic",
+            detected_issues=["toxic language"]
+        )
+        redis_client.store_decision(decision.model_dump(mode='json'))
+        content_ids.append(decision.content_id)
+    
+    for content_id in content_ids:
+        response = client.post("/appeal", json={
+            "content_id": content_id,
+            "user_id": "appeal-user",
+            "appeal_reason": "It was a joke"
+        })
+        assert response.status_code == 200
+    
+    assert len(built) == 1
+    registry.reset()
+
+def test_submit_stamps_post_count_in_one_call():
+    """Test that submission counts the post and enqueues it with that count"""
+    import asyncio
+    import uuid
+    from redis_client import AsyncRedisClient
+    from config import CONTENT_QUEUE
+    
+    user_id = f"atomic-user-{uuid.uuid4().hex}"
+    
+    async def run():
+        client = AsyncRedisClient()
+        try:
+            submitted = []
+            for i in range(2):
+                submitted.append(await client.submit_content({
+                    "content_id": f"{user_id}-{i}",
+                    "user_id": user_id,
+                    "content": "Same user, two posts",
+                    "content_type": "text",
+                    "metadata": {"note": "__recent_post_count__"}
+                }, 60))
+            
+            queued = []
+            for data in await client.client.lrange(CONTENT_QUEUE, 0, -1):
+                payload = json.loads(data)
+                if payload["user_id"] == user_id:
+                    queued.append(payload)
+                    await client.client.lrem(CONTENT_QUEUE, 1, data)
+            return submitted, queued
+        finally:
+            await client.close()
+    
+    submitted, queued = asyncio.run(run())
+    
+    assert [s["post_count"] for s in submitted] == [1, 2]
+    assert all(s["accepted"] and s["queue_depth"] >= 1 for s in submitted)
+    assert sorted(p["metadata"]["recent_post_count"] for p in queued) == [1, 2]
+    assert all(p["metadata"]["note"] == "__recent_post_count__" for p in queued)
+
+def test_submit_batch():
+    """Test bulk submission as a JSON array and as NDJSON"""
+    submissions = [
+        {"content": f"Batch post {i}", "content_type": "text", "user_id": "batch-api-user"}
+        for i in range(3)
+    ]
+    
+    response = client.post("/moderate/batch", json=submissions)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 3
+    assert len(set(data["content_ids"])) == 3
+    
+    ndjson = "\n".join(json.dumps(submission) for submission in submissions[:2])
+    response = client.post(
+        "/moderate/batch",
+        content=ndjson,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+
+def test_submit_batch_rejects_invalid_items():
+    """Test that one invalid item rejects the whole batch"""
+    response = client.post("/moderate/batch", json=[
+        {"content": "Fine", "user_id": "batch-api-user"},
+        {"content": "Missing user"}
+    ])
+    
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["index"] == 1
+
+def test_submit_batch_accepts_only_plain_json():
+    """Test that tagged storage payloads are rejected as request bodies"""
+    import codec
+    
+    submissions = [{"content": "Fine", "user_id": "batch-api-user"}]
+    tagged = [
+        codec.TAG + codec.ZSTD + b"\x28\xb5\x2f\xfd not a zstd frame",
+        codec.TAG + codec.MSGPACK + b"\x91\x80",
+        b"[{\"content\": ",
+    ]
+    if codec.zstandard is not None:
+        tagged.append(codec.encode(submissions, "json", 1))
+    for body in tagged:
+        response = client.post("/moderate/batch", content=body, headers={"Content-Type": "application/json"})
+        assert response.status_code == 400
+    
+    response = client.post(
+        "/moderate/batch",
+        content=b"\n".join([codec.encode_json(submissions[0]), codec.TAG + codec.ZSTD + b"junk"]),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 400
+
+def test_post_window_is_bounded():
+    """Test that the sliding-window post counter reads without counting and stays small"""
+    from config import SPAM_WINDOW_BUCKETS
+    from redis_client import post_window_key
+    
+    user_id = f"window-user-{time.time()}"
+    for expected in range(1, 4):
+        assert redis_client.track_user_posts(user_id) == expected
+    
+    assert redis_client.get_user_post_count(user_id) == 3
+    assert redis_client.get_user_post_counts([user_id, "window-nobody"]) == {user_id: 3, "window-nobody": 0}
+    assert redis_client.client.hlen(post_window_key(user_id)) <= SPAM_WINDOW_BUCKETS
+
+def test_hot_user_sketch_offloads_bursters():
+    """Test that only bursting users are counted in-process and synced in bulk"""
+    import asyncio
+    import uuid
+    from hot_users import HotUserTracker
+    from redis_client import AsyncRedisClient
+    from config import CONTENT_QUEUE, SPAM_BURST_THRESHOLD
+    
+    tracker = HotUserTracker(sync_interval=0)
+    for i in range(500):
+        for _ in range(SPAM_BURST_THRESHOLD - 1):
+            assert tracker.observe(f"quiet-{i}") is None
+    
+    user_id = f"raid-user-{uuid.uuid4().hex}"
+    counts = [tracker.observe(user_id) for _ in range(SPAM_BURST_THRESHOLD * 4)]
+    hot = [count for count in counts if count is not None]
+    
+    assert hot and all(SPAM_BURST_THRESHOLD <= count <= posts for posts, count in enumerate(counts, 1) if count)
+    assert tracker.sync_due()
+    
+    async def run():
+        client = AsyncRedisClient()
+        try:
+            submitted = await client.submit_content({
+                "content_id": f"{user_id}-hot",
+                "user_id": user_id,
+                "content": "Raid post",
+                "content_type": "text"
+            }, 60, 0, hot[-1])
+            for data in await client.client.lrange(CONTENT_QUEUE, 0, -1):
+                if user_id in data:
+                    await client.client.lrem(CONTENT_QUEUE, 1, data)
+            before_sync = await client.get_user_post_count(user_id)
+            await client.add_user_posts(tracker.drain())
+            return submitted, before_sync, await client.get_user_post_count(user_id)
+        finally:
+            await client.close()
+    
+    submitted, before_sync, after_sync = asyncio.run(run())
+    
+    assert submitted["post_count"] == hot[-1]
+    assert before_sync == 0
+    assert after_sync == len(hot)
+
+def test_payloads_decode_across_formats():
+    """Test that decisions stored before the codec and as JSON read back"""
+    import uuid
+    import codec
+    
+    content_id = f"codec-{uuid.uuid4().hex}"
+    decision = {"content_id": content_id, "action": "approve", "reasoning": "Looks fine. " * 200, "confidence": 0.9}
+    
+    redis_client.client.setex(f"decision:{content_id}", 60, json.dumps(decision))
+    assert redis_client.get_decision(content_id) == decision
+    
+    redis_client.store_decision(decision)
+    assert redis_client.get_decision(content_id) == decision
+    
+    payload = codec.encode(decision, "json", 0)
+    assert payload[:1] != codec.TAG
+    redis_client.client.setex(f"decision:{content_id}", 60, payload)
+    assert redis_client.get_decision(content_id) == decision
+    
+    with pytest.raises(ValueError):
+        codec.decode(codec.TAG + b"?")
+
+def test_msgpack_payloads_decode():
+    """Test that msgpack-encoded decisions are tagged and read back"""
+    pytest.importorskip("msgpack")
+    import uuid
+    import codec
+    
+    content_id = f"codec-{uuid.uuid4().hex}"
+    decision = {"content_id": content_id, "action": "review", "reasoning": "Borderline", "confidence": 0.6}
+    
+    payload = codec.encode(decision, "msgpack", 0)
+    assert payload[:2] == codec.TAG + codec.MSGPACK
+    redis_client.client.setex(f"decision:{content_id}", 60, payload)
+    assert redis_client.get_decision(content_id) == decision
+
+def test_compressed_payloads_decode():
+    """Test that large decisions are zstd-compressed in every format and read back"""
+    pytest.importorskip("zstandard")
+    import uuid
+    import codec
+    
+    content_id = f"codec-{uuid.uuid4().hex}"
+    decision = {"content_id": content_id, "action": "approve", "reasoning": "Looks fine. " * 200, "confidence": 0.9}
+    
+    payload_formats = ["json"]
+    if codec.msgpack is not None:
+        payload_formats.append("msgpack")
+    for payload_format in payload_formats:
+        payload = codec.encode(decision, payload_format, 1024)
+        assert payload[:2] == codec.TAG + codec.ZSTD
+        assert len(payload) < len(codec.encode(decision, payload_format, 0))
+        redis_client.client.setex(f"decision:{content_id}", 60, payload)
+        assert redis_client.get_decision(content_id) == decision
+    
+    # Below the threshold the body is stored as is
+    assert codec.encode(decision, "json", 1 << 20)[:1] != codec.TAG
+
+def test_result_consumer_checkpoints_batches():
+    """Test that results stream to a consumer group and only acked ones are done"""
+    import uuid
+    from result_consumer import ResultConsumer
+    
+    group = f"test-group-{uuid.uuid4().hex}"
+    consumer = ResultConsumer(group, "consumer-a", redis_client, batch_size=2, start_id="$")
+    results = [{"content_id": f"{group}-{i}", "action": "approve", "severity": 0.1} for i in range(3)]
+    redis_client.store_results_batch(results, [])
+    
+    first = consumer.read(100)
+    assert [result for _, result in first] == results[:2]
+    
+    # A restart under the same name gets the unacked batch back first
+    restarted = ResultConsumer(group, "consumer-a", redis_client, batch_size=2)
+    assert restarted.read(100) == first
+    restarted.ack([entry_id for entry_id, _ in first])
+    
+    rest = restarted.read(100)
+    assert [result for _, result in rest] == results[2:]
+    
+    # Unacked results of a consumer that is gone are taken over by another
+    other = ResultConsumer(group, "consumer-b", redis_client, batch_size=2)
+    assert other.reclaim(0) == rest
+    other.ack([entry_id for entry_id, _ in rest])
+    assert other.read(100) == []
+    assert not redis_client.client.exists("moderation_results")
+
+def test_malformed_queue_items_are_dead_lettered():
+    """Test that one malformed payload doesn't cost the rest of a dequeued batch"""
+    from config import CONTENT_QUEUE, DEAD_LETTER_QUEUE
+    
+    jobs = [
+        {"content_id": f"malformed-test-{i}", "user_id": "malformed-user", "content": "Hi", "content_type": "text"}
+        for i in range(2)
+    ]
+    redis_client.enqueue_content(jobs[0])
+    redis_client.client.lpush(CONTENT_QUEUE, "{not json", "[1, 2]")
+    redis_client.enqueue_content(jobs[1])
+    
+    batch = redis_client.dequeue_batch(100, timeout=1)
+    
+    assert jobs[0] in batch and jobs[1] in batch
+    dead = redis_client.client.lrange(DEAD_LETTER_QUEUE, 0, 1)
+    assert sorted(dead) == sorted(["{not json", "[1, 2]"])
+    redis_client.client.lrem(DEAD_LETTER_QUEUE, 1, "{not json")
+    redis_client.client.lrem(DEAD_LETTER_QUEUE, 1, "[1, 2]")
+
+def test_get_redis_closes_the_client_of_a_previous_loop(monkeypatch):
+    """Test that replacing the shared async client for a new loop closes the old one"""
+    import asyncio
+    import api
+    from redis_client import AsyncRedisClient
+    
+    closed = []
+    original_close = AsyncRedisClient.close
+    
+    async def close(self):
+        closed.append(self)
+        await original_close(self)
+    
+    monkeypatch.setattr(AsyncRedisClient, "close", close)
+    monkeypatch.setattr(api, "redis_client", None)
+    monkeypatch.setattr(api, "redis_loop", None)
+    
+    async def ping():
+        client = await api.get_redis()
+        await client.ping()
+        return client
+    
+    first = asyncio.run(ping())
+    second = asyncio.run(ping())
+    
+    assert second is not first
+    assert closed == [first]
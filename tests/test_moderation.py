@@ -40,6 +40,32 @@ def test_spam_burst_suspension(workflow):
     assert result.action in [ModerationAction.SUSPEND, ModerationAction.FLAG]
     assert "spam" in " ".join(result.detected_issues).lower()
 
+def test_spam_burst_uses_live_post_count():
+    """Test that posts made after submission count towards a burst"""
+    class PostCounts:
+        def get_user_post_count(self, user_id):
+            return SPAM_BURST_THRESHOLD + 2
+        
+        def get_user_post_counts(self, user_ids):
+            return {user_id: SPAM_BURST_THRESHOLD + 2 for user_id in user_ids}
+    
+    workflow = ModerationWorkflow(llm_client=None)
+    workflow.redis_client = PostCounts()
+    state = WorkflowState(
+        content_id="test-live",
+        user_id="user-live",
+        content="Check out my new blog post about gardening tips",
+        content_type="text",
+        metadata={"recent_post_count": 1}
+    )
+    
+    result = workflow.process_content(state.model_dump())
+    batch = workflow.analyze_batch([state.model_dump()])
+    
+    assert "spam burst detected" in result.detected_issues
+    assert result.spam_score == 1.0
+    assert batch[0]["spam_score"] == 1.0
+
 def test_sarcasm_borderline_review(workflow):
     """Test that borderline sarcastic content goes to human review"""
     state = WorkflowState(
@@ -88,6 +114,18 @@ def test_language_detection(workflow):
     assert result.language is not None
     assert result.language == "en"
 
+def test_language_detection_fast_paths_and_confidence():
+    """Test script fast paths, short text and deterministic detector results"""
+    from language import detect_language
+    
+    assert detect_language("ありがとうございます") == ("ja", 1.0)
+    assert detect_language("ok thanks") == ("en", 0.0)
+    
+    text = "Bonjour, je suis très content de vous voir aujourd'hui"
+    language, confidence = detect_language(text)
+    assert language == "fr" and confidence > 0.9
+    assert all(detect_language(text) == (language, confidence) for _ in range(5))
+
 def test_multiple_issues_detection(workflow):
     """Test detection of multiple issues"""
     state = WorkflowState(
@@ -151,3 +189,628 @@ def test_high_severity_immediate_action(workflow):
     
     assert result.severity >= 0.5, f"Expected severity >= 0.5, got {result.severity}"
     assert result.action in [ModerationAction.SUSPEND, ModerationAction.FLAG]
+
+def test_lexicon_matches_substring_scan():
+    """Test that the compiled lexicon scores like a term-by-term substring scan"""
+    from lexicon import LexiconMatcher
+    from config import TOXIC_KEYWORDS, SPAM_INDICATORS, SARCASM_INDICATORS
+    
+    lexicons = {
+        "toxicity": TOXIC_KEYWORDS,
+        "spam": SPAM_INDICATORS,
+        "sarcasm": SARCASM_INDICATORS
+    }
+    matcher = LexiconMatcher(lexicons)
+    
+    samples = [
+        "I hate you, you're stupid and should die",
+        "Buy now! Click here for free money!!! www.example.com http",
+        "yeah right, sure, totally obviously a genius lol",
+        "measure the diet of the shitake mushrooms",
+        ""
+    ]
+    
+    for text in samples:
+        content = text.lower()
+        scores = matcher.score(content)
+        for category, terms in lexicons.items():
+            expected = 0.0
+            for term, weight in terms.items():
+                if term in content:
+                    expected += weight
+            assert scores[category] == expected, (category, text)
+
+def test_lexicon_handles_large_term_lists():
+    """Test that thousands of terms compile and overlapping terms all match"""
+    from lexicon import LexiconMatcher
+    
+    terms = {f"term{i:04d}": 0.001 for i in range(5000)}
+    terms.update({"he": 0.1, "she": 0.1, "hers": 0.1})
+    matcher = LexiconMatcher({"custom": terms})
+    
+    assert len(matcher) == 5003
+    found = matcher.matches("ushers and term0042")["custom"]
+    assert set(found) == {"he", "she", "hers", "term0042"}
+
+def test_analyze_batch_matches_rule_based_analysis(workflow):
+    """Test that the vectorized batch path matches the scalar rule-based path"""
+    contents = [
+        "I hate you, you're stupid and should die",
+        "Buy now! Click here for free money!!!",
+        "Yeah right, that's totally what happened, sure",
+        "This is a nice day. I enjoy spending time with friends.",
+        "spam spam spam spam eggs",
+        "lol",
+        ""
+    ]
+    states = [
+        WorkflowState(
+            content_id=f"batch-{i}",
+            user_id="user-batch",
+            content=content,
+            content_type="text",
+            metadata={"recent_post_count": SPAM_BURST_THRESHOLD if i == 1 else 0}
+        )
+        for i, content in enumerate(contents)
+    ]
+    
+    batch = workflow.analyze_batch([state.model_dump() for state in states])
+    
+    for state, result in zip(states, batch):
+        expected = workflow._rule_based_analysis(state)
+        if state.metadata["recent_post_count"] >= SPAM_BURST_THRESHOLD:
+            expected["spam_score"] = 1.0
+            expected["detected_issues"] = expected["detected_issues"] + ["spam burst detected"]
+        expected["severity"] = workflow.calculate_severity(state.model_copy(update=expected))["severity"]
+        assert result == expected
+    
+    processed = workflow.process_batch([state.model_dump() for state in states])
+    for state, result in zip(states, processed):
+        single = workflow.process_content(state.model_dump())
+        assert result.severity == single.severity
+        assert result.action == single.action
+        assert result.detected_issues == single.detected_issues
+
+def test_feature_record_built_once(workflow):
+    """Test that the first node builds the feature record used by later nodes"""
+    state = WorkflowState(
+        content_id="test-features",
+        user_id="user-features",
+        content="Spam spam SPAM eggs, visit www.example.com or http://example.org",
+        content_type="text",
+        metadata={}
+    )
+    
+    result = workflow.process_content(state.model_dump())
+    features = result.features
+    
+    assert features["normalized"] == state.content.lower()
+    assert features["token_count"] == 8
+    assert features["repetition_ratio"] == 3 / 8
+    assert features["url_count"] == 2
+    assert features["char_count"] == len(state.content)
+
+class FakeLLMClient:
+    """Minimal stand-in for anthropic.Anthropic that counts calls"""
+    
+    def __init__(self, response: str):
+        self.calls = 0
+        self.messages = self
+        self.response = response
+    
+    def create(self, **kwargs):
+        self.calls += 1
+        block = type("Block", (), {"text": self.response})()
+        return type("Response", (), {"content": [block]})()
+
+def test_decision_cache_skips_repeat_llm_calls():
+    """Test that repeated content is served from the decision cache"""
+    import config
+    
+    llm = FakeLLMClient(
+        '{"toxicity_score": 0.9, "spam_score": 0.1, "sarcasm_score": 0.0, '
+        '"detected_issues": ["harassment"], "analysis": "abusive"}'
+    )
+    workflow = ModerationWorkflow(llm_client=llm)
+    
+    def submit(content):
+        return workflow.process_content(WorkflowState(
+            content_id="test-cache",
+            user_id="user-cache",
+            content=content,
+            content_type="text",
+            metadata={}
+        ).model_dump())
+    
+    first = submit("You are a terrible person")
+    second = submit("you are  a TERRIBLE person")
+    
+    assert llm.calls == 1
+    assert second.toxicity_score == first.toxicity_score == 0.9
+    assert workflow.decision_cache.stats()["local_hits"] == 1
+    
+    # Changing a policy threshold invalidates cached decisions
+    original = config.SEVERITY_THRESHOLDS["flag"]
+    config.SEVERITY_THRESHOLDS["flag"] = 0.65
+    try:
+        submit("You are a terrible person")
+    finally:
+        config.SEVERITY_THRESHOLDS["flag"] = original
+    
+    assert llm.calls == 2
+
+def test_llm_calls_retry_transient_failures(monkeypatch):
+    """Test that dropped connections and server errors are retried, client errors are not"""
+    import anthropic
+    import httpx
+    import moderation_graph
+    
+    monkeypatch.setattr(moderation_graph, "_retry_delay", lambda attempt: 0)
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    
+    def status_error(code):
+        return anthropic.APIStatusError("failed", response=httpx.Response(code, request=request), body=None)
+    
+    class FlakyLLMClient(FakeLLMClient):
+        def __init__(self, response, failures):
+            super().__init__(response)
+            self.failures = failures
+        
+        def create(self, **kwargs):
+            if self.failures:
+                self.calls += 1
+                raise self.failures.pop(0)
+            return super().create(**kwargs)
+    
+    response = ('{"toxicity_score": 0.0, "spam_score": 0.0, "sarcasm_score": 0.0, '
+                '"detected_issues": [], "analysis": "fine"}')
+    llm = FlakyLLMClient(response, [
+        anthropic.APIConnectionError(request=request),
+        anthropic.APITimeoutError(request=request),
+        status_error(503)
+    ])
+    ModerationWorkflow(llm_client=llm)._create_message(max_tokens=1, messages=[])
+    assert llm.calls == 4
+    
+    llm = FlakyLLMClient(response, [status_error(400)])
+    with pytest.raises(anthropic.APIStatusError):
+        ModerationWorkflow(llm_client=llm)._create_message(max_tokens=1, messages=[])
+    assert llm.calls == 1
+
+def test_graph_lambda_reprs_are_pinned_locally(workflow, monkeypatch):
+    """Test that graph runnables don't re-read source per call and langchain_core is left alone"""
+    import langchain_core.runnables.base as runnables_base
+    from langchain_core.runnables import RunnableLambda
+    
+    lookups = []
+    original = runnables_base.get_lambda_source
+    monkeypatch.setattr(runnables_base, "get_lambda_source", lambda func: lookups.append(func) or original(func))
+    
+    workflow.process_content(WorkflowState(
+        content_id="test-repr",
+        user_id="user-repr",
+        content="Nothing to see here",
+        content_type="text",
+        metadata={}
+    ).model_dump())
+    assert lookups == []
+    
+    repr(RunnableLambda(lambda value: value))
+    assert len(lookups) == 1
+
+def test_cascade_escalates_only_ambiguous_content():
+    """Test that confident rule approvals skip the LLM and shadow sampling still checks them"""
+    llm = FakeLLMClient(
+        '{"toxicity_score": 0.0, "spam_score": 0.0, "sarcasm_score": 0.0, '
+        '"detected_issues": [], "analysis": "fine"}'
+    )
+    
+    def submit(workflow, content):
+        return workflow.process_content(WorkflowState(
+            content_id="test-cascade",
+            user_id="user-cascade",
+            content=content,
+            content_type="text",
+            metadata={}
+        ).model_dump())
+    
+    workflow = ModerationWorkflow(llm_client=llm, cascade=True)
+    benign = submit(workflow, "Had a lovely walk in the park with my family today")
+    assert llm.calls == 0
+    assert benign.action == ModerationAction.APPROVE and benign.cascade_tier == "rules"
+    
+    # Rule suspensions are only a suspicion, the model decides
+    toxic = submit(workflow, "You are a stupid idiot and I hate you, kill yourself loser")
+    assert llm.calls == 1 and toxic.cascade_tier == "llm" and toxic.rule_confidence == 1.0
+    
+    ambiguous = submit(workflow, "yeah right, great job genius")
+    assert llm.calls == 2 and ambiguous.cascade_tier == "llm"
+    
+    stats = workflow.cascade_stats.stats()
+    assert stats["rules"] == 1 and stats["llm"] == 2
+    assert stats["rules_rate"] == 1 / 3
+    
+    # Nothing in the lexicon scores misinformation, so clean looking claims go to the LLM
+    claim = submit(workflow, "Doctors confirm the new vaccine rewrites your DNA, read the leaked study at https://example.com/truth")
+    assert llm.calls == 3 and claim.cascade_tier == "llm"
+    
+    shadowed = ModerationWorkflow(llm_client=llm, cascade=True, shadow_rate=1.0)
+    result = submit(shadowed, "Had a lovely walk in the park with my family today")
+    assert llm.calls == 4 and result.cascade_tier == "shadow"
+    assert shadowed.cascade_stats.stats()["shadow_agreement"] == 1.0
+
+def test_cascade_escalates_substring_matches():
+    """Test that lexicon terms inside harmless words can't suspend content without the LLM"""
+    llm = FakeLLMClient(
+        '{"toxicity_score": 0.0, "spam_score": 0.0, "sarcasm_score": 0.0, '
+        '"detected_issues": [], "analysis": "fine"}'
+    )
+    workflow = ModerationWorkflow(llm_client=llm, cascade=True)
+    
+    result = workflow.process_content(WorkflowState(
+        content_id="test-cascade-trap",
+        user_id="user-cascade",
+        content="Whatever, I studied new skills for the diet plan",
+        content_type="text",
+        metadata={}
+    ).model_dump())
+    
+    # The rules alone would have suspended it with full confidence
+    assert result.rule_confidence == 1.0
+    assert llm.calls == 1 and result.cascade_tier == "llm"
+    assert result.action == ModerationAction.APPROVE
+
+def test_branches_run_in_parallel_and_merge_issues():
+    """Test that analysis, language and spam branches overlap and their issues are merged"""
+    import asyncio
+    import threading
+    
+    # Each slow branch waits for the other, so the barrier only trips when both run at once
+    barrier = threading.Barrier(2, timeout=5)
+    overlapped = []
+    
+    def meet():
+        try:
+            barrier.wait()
+            overlapped.append(True)
+        except threading.BrokenBarrierError:
+            overlapped.append(False)
+    
+    class SlowLLMClient(FakeLLMClient):
+        def create(self, **kwargs):
+            meet()
+            return super().create(**kwargs)
+    
+    class SlowPostCounts:
+        def get_user_post_count(self, user_id):
+            meet()
+            return SPAM_BURST_THRESHOLD + 1
+    
+    llm = SlowLLMClient(
+        '{"toxicity_score": 0.6, "spam_score": 0.2, "sarcasm_score": 0.0, '
+        '"detected_issues": ["harassment"], "analysis": "abusive"}'
+    )
+    workflow = ModerationWorkflow(llm_client=llm)
+    workflow.redis_client = SlowPostCounts()
+    state = WorkflowState(
+        content_id="test-parallel",
+        user_id="user-parallel",
+        content="You people are the worst, go away",
+        content_type="text",
+        metadata={}
+    ).model_dump()
+    
+    result = workflow.process_content(state)
+    
+    assert overlapped == [True, True], "Branches ran in sequence"
+    assert result.detected_issues == ["harassment", "spam burst detected"]
+    assert result.spam_score == 1.0 and result.toxicity_score == 0.6
+    assert result.language == "en"
+    
+    async_result = asyncio.run(workflow.aprocess_content({**state, "content": state["content"] + "!"}))
+    assert overlapped == [True] * 4, "Async branches ran in sequence"
+    assert async_result.detected_issues == ["harassment", "spam burst detected"]
+
+def test_near_duplicate_reuses_suspension():
+    """Test that a near-duplicate of suspended content skips the LLM"""
+    llm = FakeLLMClient(
+        '{"toxicity_score": 0.95, "spam_score": 0.9, "sarcasm_score": 0.0, '
+        '"detected_issues": ["scam"], "analysis": "crypto scam"}'
+    )
+    workflow = ModerationWorkflow(llm_client=llm)
+    
+    def submit(content_id, content):
+        return workflow.process_content(WorkflowState(
+            content_id=content_id,
+            user_id="user-wave",
+            content=content,
+            content_type="text",
+            metadata={}
+        ).model_dump())
+    
+    first = submit("wave-1", "Double your bitcoin today!!! Send 0.1 BTC to the wallet in my bio and get 0.2 back")
+    second = submit("wave-2", "Double your bitcoin today!!! Send 0.1 BTC to the wallet in my bio and get 0.2 back 🚀")
+    
+    assert first.action == ModerationAction.SUSPEND
+    assert llm.calls == 1
+    assert second.action == ModerationAction.SUSPEND
+    assert "near-duplicate of suspended content" in second.detected_issues
+    
+    # Reuse refreshes the original entry rather than indexing a copy
+    assert len(workflow.near_duplicates) == 1
+    
+    unrelated = submit("wave-3", "Looking forward to the football game this weekend with my family")
+    assert llm.calls == 2
+    assert "near-duplicate of suspended content" not in unrelated.detected_issues
+    
+    # Suspensions decided under other thresholds are not reused
+    import config
+    original = config.SEVERITY_THRESHOLDS["suspend"]
+    config.SEVERITY_THRESHOLDS["suspend"] = 0.99
+    try:
+        rerun = submit("wave-4", "Double your bitcoin today!!! Send 0.1 BTC to the wallet in my bio and get 0.2 back 🔥")
+    finally:
+        config.SEVERITY_THRESHOLDS["suspend"] = original
+    assert llm.calls == 3
+    assert "near-duplicate of suspended content" not in rerun.detected_issues
+
+def test_async_decision_cache_reads_redis_off_the_loop():
+    """Test that the async path doesn't block the event loop on the shared cache tier"""
+    import asyncio
+    import threading
+    from models import GraphState
+    
+    analysis = {"toxicity_score": 0.2, "spam_score": 0.0, "sarcasm_score": 0.0,
+                "detected_issues": [], "rationale": "cached"}
+    threads = []
+    
+    class SharedCache:
+        def get_cached_analysis(self, key):
+            threads.append(threading.current_thread())
+            return analysis
+    
+    workflow = ModerationWorkflow(async_llm_client=object(), redis_client=SharedCache())
+    state = GraphState(**workflow._start({
+        "content_id": "test-async-cache",
+        "user_id": "user-async-cache",
+        "content": "Seen before somewhere else",
+        "content_type": "text",
+        "metadata": {}
+    }))
+    
+    assert asyncio.run(workflow.aanalyze_content(state)) == analysis
+    assert threads and threads[0] is not threading.main_thread()
+
+def test_async_llm_throughput_scales_with_concurrency():
+    """Test that the async path keeps several LLM requests in flight"""
+    import asyncio
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import anthropic
+    
+    in_flight = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+    
+    class FakeMessagesHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            with lock:
+                in_flight["now"] += 1
+                in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            time.sleep(0.05)
+            with lock:
+                in_flight["now"] -= 1
+            body = json.dumps({
+                "id": "msg_fake",
+                "type": "message",
+                "role": "assistant",
+                "model": "fake",
+                "content": [{"type": "text", "text": json.dumps({
+                    "toxicity_score": 0.0,
+                    "spam_score": 0.0,
+                    "sarcasm_score": 0.0,
+                    "detected_issues": [],
+                    "analysis": "clean"
+                })}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": 10, "output_tokens": 10}
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    class FakeLLMServer(ThreadingHTTPServer):
+        request_queue_size = 64
+    
+    server = FakeLLMServer(("127.0.0.1", 0), FakeMessagesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    async def run(concurrency):
+        in_flight["peak"] = 0
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=base_url, max_retries=0)
+        workflow = ModerationWorkflow(async_llm_client=client, max_concurrency=concurrency)
+        states = [
+            WorkflowState(
+                content_id=f"async-{i}",
+                user_id="user-async",
+                content=f"Friendly message number {i} about the weather",
+                content_type="text",
+                metadata={}
+            )
+            for i in range(24)
+        ]
+        started = time.perf_counter()
+        results = await asyncio.gather(*(workflow.aanalyze_content(state) for state in states))
+        elapsed = time.perf_counter() - started
+        await client.close()
+        assert all(result["rationale"] == "clean" for result in results)
+        return elapsed, in_flight["peak"]
+    
+    try:
+        serial, serial_peak = asyncio.run(run(1))
+        concurrent, concurrent_peak = asyncio.run(run(8))
+    finally:
+        server.shutdown()
+    
+    assert serial_peak == 1
+    assert 1 < concurrent_peak <= 8
+    assert serial > 3 * concurrent, (serial, concurrent)
+
+def test_llm_micro_batching_validates_each_item():
+    """Test that queued items share one LLM call and bad items fall back to rules"""
+    import asyncio
+    import json
+    import re
+    
+    class FakeAsyncBatchClient:
+        def __init__(self):
+            self.calls = 0
+            self.messages = self
+        
+        async def create(self, **kwargs):
+            self.calls += 1
+            prompt = kwargs["messages"][0]["content"]
+            items = json.loads(re.search(r"^\[.*\]$", prompt, re.MULTILINE).group(0))
+            response = []
+            for item in items:
+                score = 1.5 if "invalid" in item["content"] else 0.1
+                response.append({
+                    "id": item["id"],
+                    "toxicity_score": score,
+                    "spam_score": 0.0,
+                    "sarcasm_score": 0.0,
+                    "detected_issues": [],
+                    "analysis": "batched"
+                })
+            block = type("Block", (), {"text": json.dumps(response)})()
+            return type("Response", (), {"content": [block]})()
+    
+    client = FakeAsyncBatchClient()
+    workflow = ModerationWorkflow(async_llm_client=client, llm_batch_size=5, llm_batch_wait_ms=10)
+    
+    contents = [f"Message {i} about gardening" for i in range(9)] + ["invalid reply expected"]
+    states = [
+        WorkflowState(
+            content_id=f"micro-{i}",
+            user_id="user-micro",
+            content=content,
+            content_type="text",
+            metadata={}
+        )
+        for i, content in enumerate(contents)
+    ]
+    
+    async def run():
+        return await asyncio.gather(*(workflow.aanalyze_content(state) for state in states))
+    
+    results = asyncio.run(run())
+    
+    assert client.calls == 2
+    assert all(result["rationale"] == "batched" for result in results[:9])
+    assert results[9]["rationale"].startswith("Rule-based analysis")
+
+def test_llm_requests_use_cached_static_prefix():
+    """Test that the system prompt is a cacheable prefix and usage is tracked"""
+    class FakeToolClient:
+        def __init__(self):
+            self.requests = []
+            self.messages = self
+        
+        def create(self, **kwargs):
+            self.requests.append(kwargs)
+            block = type("Block", (), {
+                "type": "tool_use",
+                "input": {
+                    "toxicity_score": 0.2,
+                    "spam_score": 0.0,
+                    "sarcasm_score": 0.0,
+                    "detected_issues": [],
+                    "analysis": "fine"
+                }
+            })()
+            cached = 1000 if len(self.requests) > 1 else 0
+            usage = type("Usage", (), {
+                "input_tokens": 20,
+                "output_tokens": 40,
+                "cache_creation_input_tokens": 1000 - cached,
+                "cache_read_input_tokens": cached
+            })()
+            return type("Response", (), {"content": [block], "usage": usage})()
+    
+    client = FakeToolClient()
+    workflow = ModerationWorkflow(llm_client=client)
+    
+    for i in range(2):
+        result = workflow.analyze_content(WorkflowState(
+            content_id=f"test-prefix-{i}",
+            user_id="user-prefix",
+            content=f"Post number {i} about the weather",
+            content_type="text",
+            metadata={}
+        ))
+        assert result["rationale"] == "fine"
+    
+    first, second = client.requests
+    assert first["system"] == second["system"]
+    assert first["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert first["tool_choice"] == {"type": "tool", "name": first["tools"][0]["name"]}
+    assert "weather" not in first["system"][0]["text"]
+    
+    # Shorter prefixes are silently not cached; at ~4 characters per token
+    import json
+    from prompts import PROMPT_CACHE_MIN_TOKENS
+    prefix = json.dumps(first["tools"]) + first["system"][0]["text"]
+    assert len(prefix) >= 4 * PROMPT_CACHE_MIN_TOKENS
+    
+    stats = workflow.token_usage.stats()
+    assert stats["requests"] == 2
+    assert stats["cache_read_input_tokens"] == 1000
+    assert stats["prefix_cache_hit_rate"] == pytest.approx(1000 / 2040)
+
+def test_async_workflow_matches_sync(workflow):
+    """Test that the async graph reaches the same decisions as the sync graph"""
+    import asyncio
+    
+    contents = [
+        "You are a stupid idiot and I hate you",
+        "Have a great day everyone",
+        "Yeah right, great job genius"
+    ]
+    states = [
+        WorkflowState(
+            content_id=f"test-async-{i}",
+            user_id=f"user-async-{i}",
+            content=content,
+            content_type="text",
+            metadata={}
+        ).model_dump()
+        for i, content in enumerate(contents)
+    ]
+    appeal = {**states[0], "appeal_reason": "Taken out of context"}
+    
+    async def run():
+        results = await asyncio.gather(*(workflow.aprocess_content(dict(state)) for state in states))
+        return results, await workflow.aprocess_appeal(dict(appeal))
+    
+    async_results, async_appeal = asyncio.run(run())
+    
+    for state, result in zip(states, async_results):
+        expected = workflow.process_content(dict(state))
+        assert result.action == expected.action
+        assert result.severity == expected.severity
+        assert result.detected_issues == expected.detected_issues
+    
+    assert async_appeal.is_appeal
+    assert async_appeal.action == workflow.process_appeal(dict(appeal)).action
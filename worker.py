@@ -1,110 +1,476 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import threading
 import time
+import redis
+from typing import Callable, List, Optional
 from redis_client import RedisClient
 from moderation_graph import ModerationWorkflow
-from models import ModerationDecision
-from config import ANTHROPIC_API_KEY
-import anthropic
+from registry import get_llm_client, get_async_llm_client, get_redis_client, get_workflow
+from models import ModerationDecision, ModerationStatus
+from config import (
+    ANTHROPIC_API_KEY, LLM_BATCH_SIZE, DEQUEUE_TIMEOUT, WORKER_BATCH_SIZE,
+    WORKER_HEARTBEAT_TIMEOUT, WORKER_DRAIN_TIMEOUT, WORKER_RESTART_BASE_DELAY, WORKER_RESTART_MAX_DELAY,
+    RELIABLE_QUEUE, REAPER_INTERVAL, LLM_MAX_RETRIES, LLM_TIMEOUT, LLM_RETRY_MAX_DELAY
+)
 from datetime import datetime
 
-def create_llm_client():
-    """Create Anthropic client if API key is available"""
-    if ANTHROPIC_API_KEY:
-        return anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    return None
+def build_decision(result_state) -> ModerationDecision:
+    """Create the stored decision from a finished workflow state
+    
+    The fields come from a state validated when it entered the workflow,
+    so the decision is constructed without validating them again.
+    """
+    # Determine status based on whether human review is required
+    if result_state.requires_human_review:
+        status = ModerationStatus.PENDING
+    else:
+        status = ModerationStatus.COMPLETED
+    
+    return ModerationDecision.model_construct(
+        content_id=result_state.content_id,
+        user_id=result_state.user_id,
+        content=result_state.content,
+        severity=result_state.severity,
+        action=result_state.action,
+        rationale=result_state.rationale,
+        detected_issues=result_state.detected_issues,
+        language=result_state.language,
+        status=status
+    )
+
+def build_error_result(content_data: dict, error: Exception) -> dict:
+    """Result stored for a failed job so status endpoint doesn't hang"""
+    return {
+        "content_id": content_data.get('content_id', 'unknown'),
+        "severity": 0.0,
+        "action": "review",
+        "rationale": f"Error during processing: {str(error)}",
+        "detected_issues": ["processing_error"],
+        "status": "pending",  # Valid enum value
+        "user_id": content_data.get("user_id", "unknown"),
+        "content": content_data.get("content", ""),
+        "language": "en",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+def store_error_result(redis_client: RedisClient, content_data: dict, error: Exception):
+    """Store error result so status endpoint doesn't hang"""
+    try:
+        error_result = build_error_result(content_data, error)
+        redis_client.store_result(error_result["content_id"], error_result)
+    except Exception as store_error:
+        print(f"❌ Failed to store error result: {store_error}")
+
+def process_content_job(
+    workflow: ModerationWorkflow,
+    redis_client: RedisClient,
+    batch: List[dict],
+    progress: Optional[Callable[[], None]] = None
+):
+    """Process a batch of content moderation jobs
+    
+    Without an LLM the batch takes the vectorized rule path and every outcome
+    is stored in one pipeline. With an LLM each item is its own workflow run,
+    so each result is stored as soon as it is ready. progress is called after
+    every stored outcome, e.g. to keep heartbeats fresh during a long batch.
+    """
+    print(f"Processing {len(batch)} content item(s)")
+    
+    if workflow.llm_client:
+        for content_data in batch:
+            try:
+                outcome = workflow.process_content(content_data)
+            except Exception as e:
+                outcome = e
+            store_outcomes(redis_client, [content_data], [outcome])
+            if progress is not None:
+                progress()
+        return
+    
+    try:
+        outcomes = workflow.process_batch(batch)
+    except Exception as e:
+        # Retry item by item so one bad payload doesn't fail the whole batch
+        print(f"❌ Batch processing failed, retrying items individually: {e}")
+        outcomes = []
+        for content_data in batch:
+            try:
+                outcomes.append(workflow.process_content(content_data))
+            except Exception as item_error:
+                outcomes.append(item_error)
+    
+    store_outcomes(redis_client, batch, outcomes)
+    if progress is not None:
+        progress()
 
-def process_content_job(workflow: ModerationWorkflow, redis_client: RedisClient, content_data: dict):
-    """Process a single content moderation job"""
+def store_outcomes(redis_client: RedisClient, batch: List[dict], outcomes: list):
+    """Store the decisions, or error results, of processed jobs in one pipeline"""
+    results = []
+    decisions = []
+    for content_data, outcome in zip(batch, outcomes):
+        content_id = content_data.get('content_id', 'unknown')
+        if isinstance(outcome, Exception):
+            print(f"❌ Error processing content {content_id}: {outcome}")
+            results.append(build_error_result(content_data, outcome))
+            continue
+        
+        decision = build_decision(outcome).model_dump(mode='json')
+        results.append(decision)
+        decisions.append(decision)
+        print(f"✅ Completed: {content_id} - Action: {decision['action']}, Severity: {decision['severity']:.2f}")
+    
+    redis_client.store_results_batch(results, decisions)
+
+async def aprocess_content_job(workflow: ModerationWorkflow, redis_client: RedisClient, content_data: dict):
+    """Process a single content moderation job on the event loop"""
     content_id = content_data.get('content_id', 'unknown')
     
     try:
         print(f"Processing content: {content_id}")
         
-        # Process through workflow
-        result_state = workflow.process_content(content_data)
+        result_state = await workflow.aprocess_content(content_data)
+        decision = build_decision(result_state).model_dump(mode='json')
+        
+        # Stored as both the result and the decision, serialized once
+        await asyncio.to_thread(redis_client.store_results_batch, [decision], [decision])
+        
+        print(f"✅ Completed: {content_id} - Action: {decision['action']}, Severity: {decision['severity']:.2f}")
+        
+    except Exception as e:
+        print(f"❌ Error processing content {content_id}: {e}")
+        await asyncio.to_thread(store_error_result, redis_client, content_data, e)
+
+async def run_async(workflow: ModerationWorkflow, redis_client: RedisClient, concurrency: int):
+    """Keep up to concurrency jobs in flight on one event loop"""
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+    
+    async def run_job(content_data: dict):
+        try:
+            await aprocess_content_job(workflow, redis_client, content_data)
+        finally:
+            slots.release()
+    
+    while True:
+        await slots.acquire()
+        try:
+            content_data = await asyncio.to_thread(redis_client.dequeue_content, DEQUEUE_TIMEOUT)
+        except Exception as e:
+            slots.release()
+            print(f"Worker error: {e}")
+            await asyncio.sleep(5)
+            continue
         
-        # Determine status based on whether human review is required
-        if result_state.requires_human_review:
-            status = "pending"  # Changed from "review" to valid enum value
+        if content_data:
+            task = asyncio.create_task(run_job(content_data))
+            running.add(task)
+            task.add_done_callback(running.discard)
         else:
-            status = "completed"
+            slots.release()
+
+def batch_progress(redis_client: RedisClient, heartbeat=None, worker_id: Optional[str] = None) -> Callable[[], None]:
+    """Callback run while a batch is in progress, beating the heartbeat and extending the lease"""
+    def progress():
+        if heartbeat is not None:
+            heartbeat()
+        if worker_id is not None:
+            # Without this, a batch outliving the visibility timeout is handed to another worker
+            try:
+                redis_client.heartbeat(worker_id)
+            except redis.RedisError as e:
+                print(f"❌ Failed to extend lease of {worker_id}: {e}")
+    return progress
+
+def consume(
+    workflow: ModerationWorkflow,
+    redis_client: RedisClient,
+    stop: threading.Event,
+    heartbeat=None,
+    worker_id: Optional[str] = None
+):
+    """Blocking dequeue/process loop, returns once stop is set and the current job is done
+    
+    With a worker_id, batches are claimed into the worker's processing list
+    and acked only after their results are stored, and jobs of workers whose
+    lease expired are requeued along the way.
+    """
+    progress = batch_progress(redis_client, heartbeat, worker_id)
+    next_reap = 0.0
+    while not stop.is_set():
+        if heartbeat is not None:
+            heartbeat()
         
-        # Create decision object
-        decision = ModerationDecision(
-            content_id=result_state.content_id,
-            user_id=result_state.user_id,
-            content=result_state.content,
-            severity=result_state.severity,
-            action=result_state.action,
-            rationale=result_state.rationale,
-            detected_issues=result_state.detected_issues,
-            language=result_state.language,
-            status=status
+        try:
+            # Blocking dequeues already wait for content, no extra sleep on an empty queue
+            if worker_id is None:
+                batch = redis_client.dequeue_batch(WORKER_BATCH_SIZE, timeout=DEQUEUE_TIMEOUT)
+            else:
+                if time.monotonic() >= next_reap:
+                    reaped = redis_client.requeue_expired()
+                    if any(reaped.values()):
+                        print(f"Requeued {reaped['requeued']} expired job(s), dead-lettered {reaped['dead_lettered']}")
+                    next_reap = time.monotonic() + REAPER_INTERVAL
+                batch = redis_client.claim_batch(worker_id, WORKER_BATCH_SIZE, timeout=DEQUEUE_TIMEOUT)
+            
+            if batch:
+                process_content_job(workflow, redis_client, batch, progress)
+                if worker_id is not None:
+                    redis_client.ack_batch(worker_id, [content_data.get('content_id', 'unknown') for content_data in batch])
+        except Exception as e:
+            print(f"Worker error: {e}")
+            stop.wait(5)
+    
+    if worker_id is not None:
+        try:
+            redis_client.release_worker(worker_id)
+        except Exception as e:
+            print(f"Failed to release worker lease: {e}")
+
+def consumer_id(slot: int = 0) -> str:
+    """Identity of a consumer in the reliable queue"""
+    return f"{socket.gethostname()}:{os.getpid()}:{slot}"
+
+def run_child(index: int, threads: int, heartbeat, reliable: bool = RELIABLE_QUEUE):
+    """Pool child: one workflow shared by threads consumer threads"""
+    stop = threading.Event()
+    
+    def request_stop(signum, frame):
+        stop.set()
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    redis_client = get_redis_client()
+    workflow = get_workflow()
+    
+    # Each consumer stamps its slot on every loop; the oldest stamp is the child's heartbeat
+    beats = [time.monotonic()] * threads
+    
+    def beat_for(slot: int):
+        def beat():
+            beats[slot] = time.monotonic()
+        return beat
+    
+    consumers = [
+        threading.Thread(
+            target=consume,
+            args=(workflow, redis_client, stop, beat_for(slot), consumer_id(slot) if reliable else None),
+            name=f"consumer-{index}-{slot}"
         )
+        for slot in range(threads)
+    ]
+    for consumer in consumers:
+        consumer.start()
+    
+    crashed = False
+    while not stop.is_set():
+        if not all(consumer.is_alive() for consumer in consumers):
+            print(f"❌ Worker {index}: consumer thread died, restarting process")
+            crashed = True
+            stop.set()
+            break
+        heartbeat.value = min(beats)
+        stop.wait(1)
+    
+    for consumer in consumers:
+        consumer.join()
+    
+    if crashed:
+        raise SystemExit(1)
+    report_cascade(workflow)
+    print(f"Worker {index} drained")
+
+def report_cascade(workflow: ModerationWorkflow):
+    """Print how many items each cascade tier decided"""
+    if workflow.cascade:
+        print(f"Cascade tiers: {workflow.cascade_stats.stats()}")
+
+class WorkerPool:
+    """Supervisor keeping processes worker children alive, each with threads consumers
+    
+    Children publish a heartbeat through shared memory. A child that exits, or
+    whose heartbeat is older than heartbeat_timeout, is replaced, after a delay
+    that doubles with each consecutive failure of that child. On SIGTERM or
+    SIGINT every child is asked to finish its in-flight jobs, and children still
+    running after drain_timeout are killed.
+    """
+    
+    def __init__(
+        self,
+        processes: int,
+        threads: int,
+        reliable: bool = RELIABLE_QUEUE,
+        heartbeat_timeout: float = WORKER_HEARTBEAT_TIMEOUT,
+        drain_timeout: float = WORKER_DRAIN_TIMEOUT,
+        restart_base_delay: float = WORKER_RESTART_BASE_DELAY,
+        restart_max_delay: float = WORKER_RESTART_MAX_DELAY,
+        target: Callable = run_child
+    ):
+        self.processes = processes
+        self.threads = threads
+        self.reliable = reliable
+        self.heartbeat_timeout = heartbeat_timeout
+        self.drain_timeout = drain_timeout
+        self.restart_base_delay = restart_base_delay
+        self.restart_max_delay = restart_max_delay
+        self.target = target
+        self.children = {}
+        self.restarts = 0
+        self._failures = {}
+        self._started = {}
+        self._respawn_at = {}
+        self._stop = threading.Event()
         
-        # Store results
-        redis_client.store_result(
-            content_data["content_id"],
-            decision.model_dump(mode='json')
+        # Consumers beat between items, so one item's LLM call must fit in the timeout
+        llm_budget = (LLM_MAX_RETRIES + 1) * LLM_TIMEOUT + LLM_MAX_RETRIES * LLM_RETRY_MAX_DELAY
+        if llm_budget >= heartbeat_timeout:
+            print(f"❌ LLM calls can take {llm_budget:.0f}s with retries, over the {heartbeat_timeout}s heartbeat timeout")
+    
+    def _spawn(self, index: int):
+        heartbeat = multiprocessing.Value("d", time.monotonic(), lock=False)
+        process = multiprocessing.Process(
+            target=self.target,
+            args=(index, self.threads, heartbeat, self.reliable),
+            name=f"moderation-worker-{index}"
         )
-        redis_client.store_decision(decision.model_dump(mode='json'))
+        process.start()
+        self.children[index] = (process, heartbeat)
+        self._started[index] = time.monotonic()
+    
+    def _check(self):
+        """Replace children that exited or stopped heartbeating, backing off on repeated failures"""
+        now = time.monotonic()
+        for index, (process, heartbeat) in list(self.children.items()):
+            if index in self._respawn_at:
+                if now >= self._respawn_at[index]:
+                    del self._respawn_at[index]
+                    self._spawn(index)
+                continue
+            
+            if not process.is_alive():
+                print(f"❌ Worker {index} exited with code {process.exitcode}")
+            elif now - heartbeat.value > self.heartbeat_timeout:
+                print(f"❌ Worker {index} missed its heartbeat")
+                process.kill()
+                process.join()
+            else:
+                continue
+            
+            # A child that ran for a while before failing starts over at the base delay
+            failures = self._failures.get(index, 0)
+            if now - self._started[index] >= self.restart_max_delay:
+                failures = 0
+            delay = min(self.restart_base_delay * 2 ** failures, self.restart_max_delay)
+            self._failures[index] = failures + 1
+            self._respawn_at[index] = now + delay
+            self.restarts += 1
+            print(f"Restarting worker {index} in {delay:.1f}s")
+    
+    def _drain(self):
+        """Ask every child to stop and wait for in-flight jobs to finish"""
+        for process, _ in self.children.values():
+            if process.is_alive():
+                process.terminate()
         
-        print(f"✅ Completed: {content_id} - Action: {decision.action}, Severity: {decision.severity:.2f}")
+        deadline = time.monotonic() + self.drain_timeout
+        for index, (process, _) in self.children.items():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                print(f"Worker {index} did not drain in time, killing it")
+                process.kill()
+                process.join()
+    
+    def stop(self, signum=None, frame=None):
+        self._stop.set()
+    
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
         
-    except Exception as e:
-        print(f"❌ Error processing content {content_id}: {e}")
+        for index in range(self.processes):
+            self._spawn(index)
+        print(f"Worker pool ready with {self.processes} processes x {self.threads} threads. Waiting for content...")
         
-        # Store error result so status endpoint doesn't hang
-        try:
-            error_result = {
-                "content_id": content_id,
-                "severity": 0.0,
-                "action": "review",
-                "rationale": f"Error during processing: {str(e)}",
-                "detected_issues": ["processing_error"],
-                "status": "pending",  # Valid enum value
-                "user_id": content_data.get("user_id", "unknown"),
-                "content": content_data.get("content", ""),
-                "language": "en",
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            redis_client.store_result(content_id, error_result)
-        except Exception as store_error:
-            print(f"❌ Failed to store error result: {store_error}")
+        while not self._stop.wait(1):
+            self._check()
+        
+        print("\nDraining worker pool...")
+        self._drain()
 
 def main():
     """Main worker loop"""
+    parser = argparse.ArgumentParser(description="Content moderation worker")
+    parser.add_argument(
+        "--concurrency", type=int, default=1,
+        help="jobs kept in flight on an async event loop (1 runs the blocking loop)"
+    )
+    parser.add_argument(
+        "--llm-batch", type=int, default=LLM_BATCH_SIZE,
+        help="items classified per LLM call when running with --concurrency"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1,
+        help="worker processes run under a supervisor"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=1,
+        help="consumer threads per worker process, sharing one workflow"
+    )
+    parser.add_argument(
+        "--reliable", action="store_true", default=RELIABLE_QUEUE,
+        help="claim jobs into leased processing lists so crashed workers don't lose them"
+    )
+    args = parser.parse_args()
+    
+    pooled = args.processes > 1 or args.threads > 1
+    if args.concurrency > 1 and (pooled or args.reliable):
+        parser.error("--concurrency cannot be combined with --processes/--threads/--reliable")
+    
     print("Starting moderation worker...")
     
-    redis_client = RedisClient()
+    redis_client = get_redis_client()
     if not redis_client.ping():
         print("ERROR: Cannot connect to Redis. Please start Redis server.")
         return
     
-    llm_client = create_llm_client()
-    if llm_client:
+    if ANTHROPIC_API_KEY:
         print("Using Claude Sonnet 4.5 for content analysis")
     else:
         print("Using rule-based analysis (set ANTHROPIC_API_KEY for LLM analysis)")
     
-    workflow = ModerationWorkflow(llm_client)
-    print("Worker ready. Waiting for content...")
+    if pooled:
+        WorkerPool(args.processes, args.threads, reliable=args.reliable).run()
+        return
     
-    while True:
+    if args.concurrency > 1:
+        workflow = ModerationWorkflow(
+            get_llm_client(),
+            redis_client=redis_client,
+            async_llm_client=get_async_llm_client(),
+            max_concurrency=args.concurrency,
+            llm_batch_size=args.llm_batch
+        )
+        print(f"Worker ready with {args.concurrency} concurrent jobs. Waiting for content...")
         try:
-            # Get next content from queue
-            content_data = redis_client.dequeue_content(timeout=5)
-            
-            if content_data:
-                process_content_job(workflow, redis_client, content_data)
-            else:
-                time.sleep(1)
-                
+            asyncio.run(run_async(workflow, redis_client, args.concurrency))
         except KeyboardInterrupt:
             print("\nShutting down worker...")
-            break
-        except Exception as e:
-            print(f"Worker error: {e}")
-            time.sleep(5)
+        report_cascade(workflow)
+        return
+    
+    workflow = get_workflow()
+    print("Worker ready. Waiting for content...")
+    
+    try:
+        consume(workflow, redis_client, threading.Event(), worker_id=consumer_id() if args.reliable else None)
+    except KeyboardInterrupt:
+        print("\nShutting down worker...")
+    report_cascade(workflow)
 
 if __name__ == "__main__":
     main()